@@ -0,0 +1,167 @@
+# Timing analysis of task set runs, and statistics over repeated runs.
+# The Task reactor of BasicTaskSetGeneratorTemplate.lf prints, for every release
+# of every task, its logical release time, the physical time it started executing
+# and the physical time it finished. This module turns that output into per-release
+# response times and lateness, and summarizes them into tail latencies,
+# deadline miss ratios and worker utilization.
+
+
+import re
+from array import array
+
+import numpy as np
+from scipy import stats
+
+RELEASE = re.compile(r'Task (\d+) released at logical time (-?\d+) nsec, '
+                     r'physical time (-?\d+) nsec, execution time (-?\d+) nsec$')
+FINISH = re.compile(r'Task (\d+) finished execution at physical time (-?\d+) nsec$')
+
+TIME_UNITS = {
+    'nsec': 1, 'nsecs': 1, 'ns': 1,
+    'usec': 1000, 'usecs': 1000, 'us': 1000,
+    'msec': 1000000, 'msecs': 1000000, 'ms': 1000000,
+    'sec': 1000000000, 'secs': 1000000000, 'second': 1000000000, 'seconds': 1000000000, 's': 1000000000,
+    'min': 60000000000, 'mins': 60000000000, 'minute': 60000000000, 'minutes': 60000000000,
+}
+
+# Names of the metrics returned by summarize(), in a fixed order.
+METRICS = ['releases', 'response_mean', 'response_p50', 'response_p95', 'response_p99', 'response_max',
+           'lateness_max', 'deadline_misses', 'miss_ratio', 'worker_utilization']
+
+
+def time_value(value):
+    '''
+    Converts an LF time value such as "100 msec" to nanoseconds.
+    '''
+    amount, unit = value.split()
+    return int(float(amount) * TIME_UNITS[unit])
+
+
+def group_rank(ids):
+    # Index of every entry among the entries with the same id, in order of appearance.
+    order = np.argsort(ids, kind='stable')
+    sorted_ids = ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    counts = np.diff(np.r_[starts, len(ids)])
+    rank = np.empty(len(ids), dtype=np.int64)
+    rank[order] = np.arange(len(ids)) - np.repeat(starts, counts)
+    return rank
+
+
+class ReleaseParser:
+    '''
+    Collects the releases of the tasks from the output of a run, one line at
+    a time. Only the numbers are kept, in compact arrays of 64-bit integers,
+    so the output itself never needs to be held in memory.
+    '''
+    def __init__(self):
+        self.release_fields = array('q')
+        self.finish_fields = array('q')
+
+    def feed(self, line):
+        if not line.startswith('Task '):
+            return
+        match = RELEASE.match(line)
+        if match:
+            self.release_fields.extend(int(field) for field in match.groups())
+            return
+        match = FINISH.match(line)
+        if match:
+            self.finish_fields.extend(int(field) for field in match.groups())
+
+    def releases(self):
+        '''
+        Returns a dict of equally long arrays, with one entry per release that
+        finished executing: 'task', 'release' (logical), 'start' and 'finish'
+        (physical), and 'exe_time', all times in nanoseconds since the start of
+        the program.
+        '''
+        releases = np.frombuffer(self.release_fields, dtype=np.int64).reshape(-1, 4)
+        finishes = np.frombuffer(self.finish_fields, dtype=np.int64).reshape(-1, 2)
+
+        # The reactions of a task do not overlap, so the n-th finish of a task
+        # belongs to its n-th release. Releases that did not finish before the
+        # program stopped are dropped.
+        release_keys = releases[:, 0] * (len(releases) + 1) + group_rank(releases[:, 0])
+        finish_keys = finishes[:, 0] * (len(releases) + 1) + group_rank(finishes[:, 0])
+        _, r, f = np.intersect1d(release_keys, finish_keys, assume_unique=True, return_indices=True)
+        return {
+            'task': releases[r, 0],
+            'release': releases[r, 1],
+            'start': releases[r, 2],
+            'exe_time': releases[r, 3],
+            'finish': finishes[f, 1],
+        }
+
+
+def parse(output):
+    '''
+    Extracts the releases of the tasks from the whole output of a run.
+    See ReleaseParser.releases() for the format of the result.
+    '''
+    parser = ReleaseParser()
+    for line in output.splitlines():
+        parser.feed(line)
+    return parser.releases()
+
+
+def summarize(releases, elapsed, workers, deadline=None):
+    '''
+    Computes timing metrics of a run from the releases extracted by a ReleaseParser.
+
+    elapsed is the elapsed physical time of the run in nanoseconds and
+    deadline the relative deadline of every release in nanoseconds (if any).
+    Response times and lateness are reported in nanoseconds. Without any
+    release, only the number of releases is defined; the other metrics are
+    None, so that such runs are left out of averages.
+    '''
+    response = releases['finish'] - releases['release']
+    busy = releases['finish'] - releases['start']
+    metrics = dict.fromkeys(METRICS, None)
+    metrics['releases'] = len(response)
+    if len(response) == 0:
+        return metrics
+
+    metrics['worker_utilization'] = float(busy.sum() / (elapsed * workers)) if elapsed > 0 else None
+
+    p50, p95, p99 = np.percentile(response, [50, 95, 99])
+    metrics.update(response_mean=float(response.mean()), response_p50=float(p50), response_p95=float(p95),
+                   response_p99=float(p99), response_max=int(response.max()))
+    if deadline is not None:
+        lateness = response - deadline
+        misses = int(np.count_nonzero(lateness > 0))
+        metrics.update(lateness_max=int(lateness.max()), deadline_misses=misses,
+                       miss_ratio=misses / len(response))
+    return metrics
+
+
+def analyze(output, elapsed, workers, deadline=None):
+    return summarize(parse(output), elapsed, workers, deadline)
+
+
+def describe(samples, confidence=0.95):
+    '''
+    Summarizes repeated measurements of the same quantity: mean, median,
+    p95, sample standard deviation, and the half width of the confidence
+    interval of the mean (Student's t), which is infinite for fewer than
+    two samples.
+    '''
+    x = np.asarray(samples, dtype=float)
+    n = len(x)
+    if n == 0:
+        return {'n': 0, 'mean': None, 'median': None, 'p95': None, 'stddev': None, 'ci': None}
+    stddev = float(x.std(ddof=1)) if n > 1 else 0.0
+    ci = float('inf')
+    if n > 1:
+        ci = float(stats.t.ppf((1 + confidence) / 2, n - 1) * stddev / np.sqrt(n))
+    return {'n': n, 'mean': float(x.mean()), 'median': float(np.median(x)),
+            'p95': float(np.percentile(x, 95)), 'stddev': stddev, 'ci': ci}
+
+
+def converged(samples, target, confidence=0.95):
+    '''
+    Returns whether the confidence interval of the mean of samples is within
+    target, relative to the mean (e.g. 0.05 for +/- 5%).
+    '''
+    summary = describe(samples, confidence)
+    return summary['n'] > 1 and summary['ci'] <= target * abs(summary['mean'])
@@ -0,0 +1,110 @@
+# Content-addressed cache of the binaries built from generated task set programs.
+# A binary is keyed on the hash of the substituted template and the version of lfc
+# that compiled it, so identical programs are only compiled once, even across restarts.
+
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+
+
+def lfc_version(lf_path):
+    '''
+    Returns a string identifying the Lingua Franca compiler found at lf_path.
+    '''
+    out = subprocess.run(['git', 'describe', '--always', '--tags', '--dirty'],
+                         cwd=lf_path, capture_output=True)
+    if out.returncode == 0:
+        return out.stdout.decode("utf-8").strip()
+    out = subprocess.run(['./gradlew', 'runLfc', '--args', '--version'], cwd=lf_path, capture_output=True)
+    for line in out.stdout.decode("utf-8").split('\n'):
+        if line.startswith("lfc"):
+            return line.strip()
+    return "unknown"
+
+
+class BuildCache:
+    '''
+    Binaries are stored as <cache_dir>/<key> and tracked in an index file
+    recording their size and when they were last used. When the cache grows
+    beyond max_size bytes or max_entries binaries, the least recently used
+    ones are evicted. Binaries obtained with get() or put() are not
+    evicted until they are given back with release(), as a sweep may still
+    be about to run them.
+    '''
+    def __init__(self, cache_dir, version, max_size=512 * 1024 * 1024, max_entries=1000):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.max_size = max_size
+        self.max_entries = max_entries
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.in_use = set()
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+        # Forget entries whose binary has been removed by hand.
+        self.index = {key: entry for key, entry in self.index.items()
+                      if os.path.isfile(self.path(key))}
+
+    def key(self, contents):
+        digest = hashlib.sha256()
+        digest.update(self.version.encode("utf-8"))
+        digest.update(b'\0')
+        digest.update(contents.encode("utf-8"))
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        '''
+        Returns the path of the cached binary for key, or None on a miss.
+        '''
+        if key not in self.index:
+            return None
+        self.index[key]['last_used'] = time.time()
+        self.in_use.add(key)
+        self.save()
+        return self.path(key)
+
+    def put(self, key, binary):
+        '''
+        Copies a freshly built binary into the cache and returns its cached path.
+        '''
+        shutil.copy2(binary, self.path(key))
+        self.index[key] = {'size': os.path.getsize(binary), 'last_used': time.time()}
+        self.in_use.add(key)
+        self.evict()
+        self.save()
+        return self.path(key)
+
+    def release(self, keys):
+        '''
+        Allows the binaries of the given keys to be evicted again, e.g. once
+        the sweep that ran them has finished.
+        '''
+        self.in_use.difference_update(keys)
+        self.evict()
+        self.save()
+
+    def evict(self):
+        total = sum(entry['size'] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]['last_used']):
+            if total <= self.max_size and len(self.index) <= self.max_entries:
+                break
+            if key in self.in_use:
+                continue
+            total -= self.index.pop(key)['size']
+            os.remove(self.path(key))
+
+    def save(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
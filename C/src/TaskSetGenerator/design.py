@@ -0,0 +1,84 @@
+# Experimental designs for multi-dimensional task set sweeps.
+# A sweep space maps each dimension (e.g. utilization, number of tasks, periodicity,
+# number of workers) to its candidate values. Rather than always running the full
+# cartesian product, points can be sampled from it with a Latin hypercube or at
+# random, which keeps the number of programs to build manageable.
+
+
+import itertools
+
+import numpy as np
+from scipy.stats import qmc
+
+STRATEGIES = ['grid', 'lhs', 'random']
+
+# Dimensions of a task set configuration that can be swept, besides 'workers'.
+CONFIG_DIMENSIONS = ['num_tasks', 'utilization', 'periodic', 'period']
+
+
+def levels(values):
+    '''
+    Returns the candidate values of a dimension, given either as a single
+    value, a list, or a range such as {"from": 1, "to": 20, "step": 1}.
+    '''
+    if isinstance(values, dict):
+        return list(range(values['from'], values['to'] + 1, values.get('step', 1)))
+    if isinstance(values, (list, tuple)):
+        return list(values)
+    return [values]
+
+
+def grid(space):
+    '''
+    Returns every point of the cartesian product of the dimensions of space.
+    '''
+    names = list(space)
+    return [dict(zip(names, point)) for point in itertools.product(*(levels(space[n]) for n in names))]
+
+
+def sample(space, strategy='grid', samples=None, seed=None):
+    '''
+    Returns points of space, as dicts mapping each dimension to a value.
+
+    'grid' returns the whole cartesian product. 'lhs' draws samples points
+    from a Latin hypercube, so that each dimension's range is covered evenly
+    even with few points, and 'random' draws them uniformly. Points drawn
+    more than once are only returned once.
+    '''
+    if strategy == 'grid':
+        return grid(space)
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown sampling strategy '{strategy}', expected one of {STRATEGIES}")
+    if samples is None:
+        raise ValueError("'samples' is required for lhs/random sampling")
+
+    names = list(space)
+    values = [levels(space[n]) for n in names]
+    if strategy == 'lhs':
+        unit = qmc.LatinHypercube(d=len(names), seed=seed).random(samples)
+    else:
+        unit = np.random.default_rng(seed).random((samples, len(names)))
+    # Map each coordinate in [0, 1) onto one of the dimension's values.
+    indices = np.minimum((unit * [len(v) for v in values]).astype(int), [len(v) - 1 for v in values])
+
+    points = []
+    for row in indices:
+        point = {n: v[i] for n, v, i in zip(names, values, row)}
+        if point not in points:
+            points.append(point)
+    return points
+
+
+def configs(points):
+    '''
+    Groups sampled points by task set configuration. Returns a list of
+    (configuration, workers) pairs, where configuration holds every dimension
+    but 'workers' and workers is the sorted list of numbers of workers to
+    run that configuration with.
+    '''
+    groups = {}
+    for point in points:
+        config = {k: v for k, v in point.items() if k != 'workers'}
+        key = tuple(sorted(config.items()))
+        groups.setdefault(key, (config, set()))[1].add(point['workers'])
+    return [(config, sorted(workers)) for config, workers in groups.values()]
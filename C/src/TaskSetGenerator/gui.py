@@ -17,93 +17,334 @@ matplotlib.use('tkagg')
 
 import os
 import sys
-import subprocess
-import shutil
+import time
+import queue
+import threading
 from functools import partial
-import statistics
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-time_units = ['sec', 'msec', 'usec', 'nsec']
-
-def step(num_workers, scheduler_type):
-
-    global char_to_replace, template
-    char_to_replace['$SCHEDULER_TYPE$'] = scheduler_type
-    char_to_replace['$NUM_WORKERS$'] = str(num_workers)
-
-    contents = template
-    for key, value in char_to_replace.items():
-        contents = contents.replace(key, value)
-
-    filename = f'practice_{scheduler_type}_{num_workers}'
-    filepath = f'{WORKING_DIR}/.gui/src/{filename}.lf'
-    with open(filepath, "w") as lf_file:
-        lf_file.write(contents)
-        lf_file.close()
-        print(f"File saved: {filepath}")
-
-    out = subprocess.run([f'./gradlew','runLfc', '--args', filepath], capture_output=True)
-    built_success = False
-    for line in reversed(out.stdout.decode("utf-8").split('\n')):
-        if line.startswith("BUILD SUCCESSFUL"):
-            built_success = True
-            break
+from sweep import Sweep, BuildFailure, RunFailure, task_set, prepare_working_dir, spec_configs, heatmap_records
+from heatmap import plot_heatmaps
+from design import STRATEGIES
+from analysis import describe
+from results import ResultStore
 
-    if built_success:
-        print("Built Successfully!")
-    else:
-        print("Build Failed")
-        print(out.stderr.decode("utf-8"))
-        exit(0)
-
-    lf_out = subprocess.run([f'{WORKING_DIR}/.gui/bin/{filename}'], capture_output=True)
+time_units = ['sec', 'msec', 'usec', 'nsec']
 
-    for line in reversed(lf_out.stdout.decode("utf-8").split('\n')):
-        if line.startswith("---- Elapsed physical"):
-            exe_time = line.split(' ')[-1]
+# Quantities that can be plotted: metric name, scale factor and axis label.
+# Response times and lateness are measured in nanoseconds.
+plot_metrics = {
+    'Execution time': ('exe_time', 1, 'Execution time (sec)'),
+    'Mean response time': ('response_mean', 1e-6, 'Mean response time (msec)'),
+    'p95 response time': ('response_p95', 1e-6, 'p95 response time (msec)'),
+    'p99 response time': ('response_p99', 1e-6, 'p99 response time (msec)'),
+    'Max lateness': ('lateness_max', 1e-6, 'Max lateness (msec)'),
+    'Deadline miss ratio': ('miss_ratio', 1, 'Deadline miss ratio'),
+    'Worker utilization': ('worker_utilization', 1, 'Worker utilization'),
+}
+
+class ProgressWindow:
+    '''
+    A window showing the progress of a running sweep, with an estimate of the
+    remaining time, a button to cancel it, and a plot of the configuration
+    being measured that is updated as each measurement completes.
+    '''
+    def __init__(self, container, schedulers, metric, scale, ylabel, on_cancel):
+        self.schedulers = schedulers
+        self.metric = metric
+        self.scale = scale
+        self.ylabel = ylabel
+        self.total = 0
+        self.done = 0
+        self.run_failures = 0
+        self.build_failures = 0
+        # Whether the sweep stopped because of an error
+        self.failed = False
+        self.running = True
+        self.close_requested = False
+        self.on_cancel = on_cancel
+        self.start_time = time.monotonic()
+        self.samples = {}
+
+        self.window = tk.Toplevel(container)
+        self.window.title('Sweep progress')
+        self.window.protocol('WM_DELETE_WINDOW', self.close)
+        self.progress = ttk.Progressbar(self.window, length=500, mode='determinate')
+        self.progress.grid(column=0, row=0, sticky=tk.W)
+        self.cancel_button = ttk.Button(self.window, text='Cancel', command=on_cancel)
+        self.cancel_button.grid(column=1, row=0)
+        self.status = ttk.Label(self.window, text='Building...')
+        self.status.grid(column=0, row=1, columnspan=2, sticky=tk.W)
+
+        self.figure = Figure(figsize=(6, 4))
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.window)
+        self.canvas.get_tk_widget().grid(column=0, row=2, columnspan=2)
+        # Shown below the plot once a program fails to build
+        self.errors = None
+
+    def set_total(self, total):
+        self.total = total
+        self.progress['maximum'] = max(total, 1)
+
+    def update_status(self):
+        self.progress['value'] = self.done
+        elapsed = time.monotonic() - self.start_time
+        if self.done == 0:
+            self.status['text'] = f'0/{self.total} runs, elapsed {elapsed:.0f} s'
+            return
+        # With adaptive sampling, the total is an upper bound, and so is the estimate.
+        remaining = elapsed / self.done * max(self.total - self.done, 0)
+        self.status['text'] = f'{self.done}/{self.total} runs, elapsed {elapsed:.0f} s, ' \
+                              f'about {remaining:.0f} s remaining'
+
+    def set_config(self, number, num_configs, config):
+        # The live plot only shows the configuration being measured.
+        self.samples = {}
+        self.config_label = f'Configuration {number}/{num_configs}: {config["num_tasks"]} tasks, ' \
+                            f'utilization {config["utilization"]}'
+        self.redraw()
+
+    def add(self, measurement):
+        self.done += 1
+        self.update_status()
+        if isinstance(measurement, RunFailure):
+            self.run_failures += 1
+            return
+
+        value = measurement.exe_time if self.metric == 'exe_time' else (measurement.timing or {}).get(self.metric)
+        if value is not None:
+            self.samples.setdefault((measurement.scheduler, measurement.workers), []).append(value * self.scale)
+            self.redraw()
+
+    def build_failed(self, failure, jobs):
+        # The jobs of a program that failed to build will never run.
+        self.build_failures += 1
+        self.set_total(self.total - jobs)
+        self.update_status()
+        if self.errors is None:
+            self.errors = tk.Text(self.window, height=8, width=80)
+            self.errors.grid(column=0, row=3, columnspan=2)
+        self.errors['state'] = 'normal'
+        self.errors.insert(tk.END, f'Build failed: {failure.scheduler}, {failure.workers} workers\n'
+                                   f'{failure.error}\n')
+        self.errors['state'] = 'disabled'
+
+    def redraw(self):
+        self.ax.clear()
+        colors = ['#D81B60', '#1E88E5', '#FFC107', '#004D40', '#8794DD']
+        for i, scheduler in enumerate(self.schedulers):
+            workers = sorted(w for s, w in self.samples if s == scheduler)
+            means = [np.mean(self.samples[(scheduler, w)]) for w in workers]
+            self.ax.plot(workers, means, '--o', color=colors[i], label=scheduler)
+        self.ax.set_xlabel('Number of Worker')
+        self.ax.set_ylabel(self.ylabel)
+        self.ax.set_title(getattr(self, 'config_label', ''), fontsize=10)
+        if self.samples:
+            self.ax.legend(loc='upper right')
+        self.canvas.draw_idle()
+
+    def close(self):
+        # Closing the window cancels a running sweep, and the window goes away
+        # once the sweep has stopped, so that its events are still handled.
+        if not self.running:
+            self.window.destroy()
+            return
+        self.close_requested = True
+        self.status['text'] = 'Cancelling...'
+        self.on_cancel()
+
+    def finish(self, cancelled):
+        self.running = False
+        if self.close_requested:
+            self.window.destroy()
+            return
+        message = 'Failed' if self.failed else 'Cancelled' if cancelled else 'Done'
+        if self.build_failures:
+            message += f', {self.build_failures} builds failed'
+        if self.run_failures:
+            message += f', {self.run_failures} runs failed'
+        self.status['text'] = message
+        self.cancel_button['state'] = 'disabled'
+
+
+# Runs the sweeps of all task set configurations, off the UI thread.
+# Progress is reported to the UI thread through the events queue.
+def sweep_worker(configs, options, events):
+    global current_sweep
+    try:
+        sweeps = []
+        for config, workers in configs:
+            if not options['resume']:
+                result_store.clear(config)
+            sweeps.append((config, Sweep(options['template'], task_set(**config), WORKING_DIR, LF_PATH,
+                                         options['schedulers'], workers, options['num_iterations'],
+                                         max_parallel=options['num_parallel'], pin_cpus=options['pin_cpus'],
+                                         cache=build_cache, batch_build=options['batch_build'],
+                                         skip=result_store.measured(config),
+                                         target_ci=options['target_ci'], max_iterations=options['max_iterations'],
+                                         history=result_store.exe_times(config, options['schedulers']))))
+        events.put(('total', sum(sweep.num_jobs() for _, sweep in sweeps)))
+
+        for number, (config, sweep) in enumerate(sweeps, start=1):
+            current_sweep = sweep
+            # Checked only once the sweep is published, so that a cancel
+            # either sees it in cancel_sweep() or is seen here.
+            if cancel_requested.is_set():
+                break
+            print(f"Configuration {number}/{len(configs)}: {config}")
+            events.put(('config', number, len(configs), config))
+            for result in sweep.run():
+                if isinstance(result, BuildFailure):
+                    print("Build Failed")
+                    print(result.error)
+                    result_store.record_failure(config, result, build_cache.version)
+                    events.put(('build_failure', result, sweep.program_jobs(result.scheduler, result.workers)))
+                    continue
+                if isinstance(result, RunFailure):
+                    print(f"Run Failed: {result.scheduler}, {result.workers} workers, iteration {result.iteration}")
+                    print(result.error)
+                    result_store.record_run_failure(config, result, build_cache.version)
+                    events.put(('result', result))
+                    continue
+                summary = f"{result.exe_time} sec"
+                if result.timing and result.timing['response_p95'] is not None:
+                    summary += f", p95 response time {result.timing['response_p95'] / 1e6:.3f} msec"
+                if result.timing and result.timing['miss_ratio'] is not None:
+                    summary += f", miss ratio {result.timing['miss_ratio']:.3f}"
+                print(f"{result.scheduler}, {result.workers} workers, iteration {result.iteration}: {summary}")
+                result_store.record(config, result, build_cache.version)
+                events.put(('result', result))
+    except Exception as e:
+        events.put(('error', e))
+    events.put(('done', cancel_requested.is_set()))
+
+def cancel_sweep():
+    cancel_requested.set()
+    if current_sweep is not None:
+        current_sweep.cancel()
+
+# Handles the events of the running sweep, in the UI thread
+def poll_events(progress, events, configs, target_schedulers):
+    if not progress.window.winfo_exists():
+        # The window was destroyed along with the main window.
+        return
+    while True:
+        try:
+            event = events.get_nowait()
+        except queue.Empty:
             break
-
-    exe_time = int(exe_time.replace(',','')) / 1000000000
-    return exe_time
-    
+        if event[0] == 'total':
+            progress.set_total(event[1])
+        elif event[0] == 'config':
+            progress.set_config(*event[1:])
+        elif event[0] == 'result':
+            progress.add(event[1])
+        elif event[0] == 'build_failure':
+            progress.build_failed(*event[1:])
+        elif event[0] == 'error':
+            print(f"Sweep failed: {event[1]}")
+            progress.failed = True
+        elif event[0] == 'done':
+            progress.finish(event[1])
+            plot_results(configs, target_schedulers)
+            return
+    progress.window.after(100, poll_events, progress, events, configs, target_schedulers)
 
 # A function called when the [Run] button is clicked
 def runLfc():
 
-    global char_to_replace, template
-    workers = [1, 2, 5, 20]
+    global template, sweep_thread, current_sweep
+    if sweep_thread is not None and sweep_thread.is_alive():
+        print("A sweep is already running")
+        return
+
     schedulers = {"NP": is_NP.get(), "GEDF_NP": is_GEDF_NP.get(), "GEDF_NP_CI": is_GEDF_NP_CI.get()}
-    
 
-    char_to_replace = {
-        '$SCHEDULER_TYPE$': '',
-        '$NUM_TASKS$': str(num_tasks.get()),
-        '$TOTAL_TIME$': str(total_time.get()) + " " + str(total_time_unit.get()),
-        '$UTILIZATION$': utilization.get(),
-        '$NUM_WORKERS$': '',
-        '$PERIODIC$':'false' if periodicity.get() == 1 else 'true',
-        '$PERIOD$': str(period.get()) + " " + str(period_unit.get())
+    # Number of tasks and utilization may be comma-separated lists, to sweep over them too.
+    spec = {
+        'num_tasks': [int(n) for n in num_tasks.get().split(',')],
+        'total_time': str(total_time.get()) + " " + str(total_time_unit.get()),
+        'utilization': [float(u) for u in utilization.get().split(',')],
+        'periodic': periodicity.get() != 1,
+        'period': str(period.get()) + " " + str(period_unit.get()),
+        'logging': task_logging.get(),
+        'workers': {'from': 1, 'to': 20},
+        'sampling': {'strategy': sampling.get(), 'samples': num_samples.get()}
     }
+    configs = spec_configs(spec)
 
     with open(TEMPLATE_PATH) as f:
         template = f.read()
 
 
     target_schedulers = [k for k, v in schedulers.items() if v == True]
-    exe_times = {}
 
-    workers = [i for i in range(1, 21)]
+    # Tk variables may only be read from the UI thread, so the sweep gets a copy of their values.
+    options = {
+        'template': template,
+        'schedulers': target_schedulers,
+        'num_iterations': num_iterations.get(),
+        'num_parallel': num_parallel.get(),
+        'pin_cpus': pin_cpus.get(),
+        'batch_build': batch_build.get(),
+        'resume': resume.get(),
+        # A CI target of 0 runs exactly the given number of iterations.
+        'target_ci': float(ci_target.get()) / 100 or None,
+        'max_iterations': max_iterations.get()
+    }
 
-    
+    metric, scale, ylabel = plot_metrics[plot_metric.get()]
+    progress = ProgressWindow(main, target_schedulers, metric, scale, ylabel, cancel_sweep)
+    events = queue.Queue()
+    cancel_requested.clear()
+    current_sweep = None
+    sweep_thread = threading.Thread(target=sweep_worker, args=(configs, options, events), daemon=True)
+    sweep_thread.start()
+    poll_events(progress, events, configs, target_schedulers)
+
+# Plots the results of the sweep from the result store
+def plot_results(configs, target_schedulers):
+
+    global char_to_replace
+    # Sweeps over several task set configurations are shown as heatmaps.
+    metric, scale, ylabel = plot_metrics[plot_metric.get()]
+    if len(configs) > 1:
+        plot_heatmap(configs, target_schedulers, metric, scale, ylabel)
+        return
+
+    config, workers = configs[0]
+    char_to_replace = task_set(**config)
+
+    # Plot from the result store, which also holds the points measured by earlier runs.
+    samples = result_store.samples(config, metric, target_schedulers)
+    if not samples:
+        print("No results to plot")
+        return
+    values = {}
+    errors = {}
     for scheduler in target_schedulers:
-        exe_time = []
+        values[scheduler] = []
+        errors[scheduler] = []
         for worker in workers:
-            exe_time.append(statistics.mean([step(worker, scheduler) for _ in range(num_iterations.get())]))
-        exe_times[scheduler] = exe_time.copy()
-        exe_time.clear()
+            summary = describe(samples.get((scheduler, worker), []))
+            if summary['n'] == 0:
+                values[scheduler].append(float('nan'))
+                errors[scheduler].append(float('nan'))
+                continue
+            print(f"{scheduler}, {worker} workers: n={summary['n']}, mean={summary['mean'] * scale:.6g}, "
+                  f"median={summary['median'] * scale:.6g}, p95={summary['p95'] * scale:.6g}, "
+                  f"stddev={summary['stddev'] * scale:.6g}, 95% CI=+/-{summary['ci'] * scale:.6g}")
+            values[scheduler].append(summary['mean'] * scale)
+            # There is no confidence interval for a single sample.
+            errors[scheduler].append(summary['ci'] * scale if summary['n'] > 1 else float('nan'))
 
     result = {}
     result['workers'] = workers
-    result['exe_times'] = exe_times
+    result['values'] = values
+    result['errors'] = errors
+    result['ylabel'] = ylabel
     
     plot_graph(result)
     
@@ -117,25 +358,28 @@ def plot_graph(data):
 
     axes = []
     patches = []
-    schedulers = data['exe_times'].keys()
+    schedulers = data['values'].keys()
 
     colors = ['#D81B60', '#1E88E5', '#FFC107', '#004D40', '#8794DD']
     for i, scheduler in enumerate(schedulers):
         
         patches.append(mpatches.Patch(color=colors[i], label=scheduler))
 
+        # Error bars show the 95% confidence interval of the mean.
         if (graph_option.get() == 'line'):
-            axes.append(ax.plot(workers, data['exe_times'][scheduler], '--', color=colors[i]))
+            axes.append(ax.errorbar(workers, data['values'][scheduler], yerr=data['errors'][scheduler],
+                                    fmt='--', color=colors[i], capsize=3))
         elif (graph_option.get() == 'dot'):
-            axes.append(ax.scatter(workers, data['exe_times'][scheduler], color=colors[i]))
+            axes.append(ax.errorbar(workers, data['values'][scheduler], yerr=data['errors'][scheduler],
+                                    fmt='o', color=colors[i], capsize=3))
 
-        #plt.scatter(scatters, [data['exe_times'][scheduler][i-1] for i in scatters], color=colors[i])
+        #plt.scatter(scatters, [data['values'][scheduler][i-1] for i in scatters], color=colors[i])
         
     ax.legend(handles=patches, loc='upper right')
-    plt.axis([0, max(workers)+1, 0, max(max(i) for i in data['exe_times'].values()) * 1.2])
+    plt.axis([0, max(workers)+1, 0, np.nanmax(list(data['values'].values())) * 1.2])
     
     plt.xlabel('Number of Worker')
-    plt.ylabel('Execution time')
+    plt.ylabel(data['ylabel'])
     title = ''
     if periodicity.get() == 1:
         title += 'Sporadic'
@@ -146,6 +390,21 @@ def plot_graph(data):
     plt.title(title, fontsize= 10)
     plt.show()
 
+def plot_heatmap(configs, schedulers, metric, scale, label):
+    records = heatmap_records(result_store, configs, schedulers, metric)
+    if not records:
+        print("No results to plot")
+        return
+    for record in records:
+        record['value'] *= scale
+    y = 'num_tasks' if len({c['num_tasks'] for c, _ in configs}) > 1 else 'utilization'
+    schedulers = [s for s in schedulers if any(r['scheduler'] == s for r in records)]
+
+    title = 'Sporadic' if periodicity.get() == 1 else f'Periodic(period: {configs[0][0]["period"]})'
+    title += f' / Total time: {configs[0][0]["total_time"]}'
+    plot_heatmaps(records, 'workers', y, schedulers, label, title)
+    plt.show()
+
 def create_input_frame(container):
     initialize()
 
@@ -198,6 +457,34 @@ def create_input_frame(container):
     ttk.Radiobutton(select_graph_option, text="line", variable=graph_option, value="line").grid(column=0, row=0)
     ttk.Radiobutton(select_graph_option, text="dot", variable=graph_option, value="dot").grid(column=1, row=0)
 
+    ttk.Label(frame, text="Metric:").grid(column=0, row=9, sticky=tk.W)
+    select_plot_metric = ttk.Combobox(frame, textvariable=plot_metric, values=list(plot_metrics), state='readonly')
+    select_plot_metric.current(0)
+    select_plot_metric.grid(column=1, row=9, sticky=tk.W)
+    ttk.Checkbutton(frame, text='Log task releases', variable=task_logging, onvalue=True, offvalue=False).grid(column=2, row=9, sticky=tk.W)
+
+    ttk.Label(frame, text="CI target (%, 0 = off):").grid(column=0, row=10, sticky=tk.W)
+    ci_target_entry = ttk.Entry(frame, textvariable=ci_target)
+    ci_target_entry.grid(column=1, row=10, sticky=tk.W)
+
+    ttk.Label(frame, text="Max iterations:").grid(column=0, row=11, sticky=tk.W)
+    max_iterations_entry = ttk.Entry(frame, textvariable=max_iterations)
+    max_iterations_entry.grid(column=1, row=11, sticky=tk.W)
+
+    ttk.Label(frame, text="Sampling (samples):").grid(column=0, row=12, sticky=tk.W)
+    select_sampling = ttk.Combobox(frame, textvariable=sampling, values=STRATEGIES, state='readonly')
+    select_sampling.current(0)
+    select_sampling.grid(column=1, row=12, sticky=tk.W)
+    num_samples_entry = ttk.Entry(frame, textvariable=num_samples)
+    num_samples_entry.grid(column=2, row=12, sticky=tk.W)
+
+    ttk.Label(frame, text="Parallel runs:").grid(column=0, row=7, sticky=tk.W)
+    num_parallel_entry = ttk.Entry(frame, textvariable=num_parallel)
+    num_parallel_entry.grid(column=1, row=7, sticky=tk.W)
+    ttk.Checkbutton(frame, text='Pin CPUs', variable=pin_cpus, onvalue=True, offvalue=False).grid(column=2, row=7, sticky=tk.W)
+    ttk.Checkbutton(frame, text='Build all programs at once', variable=batch_build, onvalue=True, offvalue=False).grid(column=1, row=8, sticky=tk.W)
+    ttk.Checkbutton(frame, text='Reuse stored results', variable=resume, onvalue=True, offvalue=False).grid(column=2, row=8, sticky=tk.W)
+
 
     return frame
 
@@ -207,9 +494,10 @@ def exit(container):
 
 def set_global_variables():
     global num_tasks, total_time, total_time_unit, utilization, periodicity, period, period_unit, num_iterations
-    global is_NP, is_GEDF_NP, is_GEDF_NP_CI, graph_option
+    global is_NP, is_GEDF_NP, is_GEDF_NP_CI, graph_option, num_parallel, pin_cpus, batch_build, resume, plot_metric, task_logging
+    global ci_target, max_iterations, sampling, num_samples
 
-    num_tasks = tk.IntVar()
+    num_tasks = tk.StringVar()
     total_time = tk.IntVar()
     total_time_unit = tk.StringVar()
     utilization = tk.StringVar()
@@ -221,8 +509,18 @@ def set_global_variables():
     is_GEDF_NP = tk.BooleanVar()
     is_GEDF_NP_CI = tk.BooleanVar()
     graph_option = tk.StringVar()
-
-    num_tasks.set(20)
+    num_parallel = tk.IntVar()
+    pin_cpus = tk.BooleanVar()
+    batch_build = tk.BooleanVar()
+    resume = tk.BooleanVar()
+    plot_metric = tk.StringVar()
+    task_logging = tk.BooleanVar()
+    ci_target = tk.StringVar()
+    max_iterations = tk.IntVar()
+    sampling = tk.StringVar()
+    num_samples = tk.IntVar()
+
+    num_tasks.set("20")
     total_time.set(1)
     utilization.set("0.6")
     num_iterations.set(1)
@@ -232,13 +530,26 @@ def set_global_variables():
     is_GEDF_NP.set(True)
     is_GEDF_NP_CI.set(True)
     graph_option.set("line")
+    num_parallel.set(1)
+    pin_cpus.set(False)
+    batch_build.set(True)
+    resume.set(True)
+    task_logging.set(True)
+    ci_target.set("0")
+    max_iterations.set(20)
+    num_samples.set(40)
 
 
 def create_main():
 
+    global main, sweep_thread, current_sweep, cancel_requested
+    sweep_thread = None
+    current_sweep = None
+    cancel_requested = threading.Event()
+
     main = tk.Tk()
     main.title('TaskSet generator')
-    main.geometry('600x400')
+    main.geometry('600x570')
     main.resizable(False, False)
 
     main.rowconfigure(0, weight=3)
@@ -261,11 +572,9 @@ def create_main():
     main.mainloop()
 
 def initialize():
-    if (os.path.isdir(f'{WORKING_DIR}/.gui')):
-        shutil.rmtree(f'{WORKING_DIR}/.gui')
-
-    os.mkdir(f'{WORKING_DIR}/.gui')
-    os.mkdir(f'{WORKING_DIR}/.gui/src')
+    global build_cache, result_store
+    build_cache = prepare_working_dir(WORKING_DIR, LF_PATH)
+    result_store = ResultStore(f'{WORKING_DIR}/.gui/results.db')
 
 if __name__ == "__main__":
     global LF_PATH, WORKING_DIR, TEMPLATE_PATH
@@ -0,0 +1,66 @@
+# Heatmaps of multi-dimensional task set sweeps.
+# One panel per scheduler shows a measured quantity over two swept dimensions,
+# and a last panel shows which scheduler has the lowest value in every cell,
+# which makes crossover points between schedulers easy to spot.
+
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.colors import ListedColormap
+
+COLORS = ['#D81B60', '#1E88E5', '#FFC107', '#004D40', '#8794DD']
+
+
+def cells(records, x, y, scheduler):
+    '''
+    Returns the sorted values of dimensions x and y, and the matrix of mean
+    values of a scheduler over them (NaN where nothing was measured).
+    '''
+    xs = sorted({r[x] for r in records})
+    ys = sorted({r[y] for r in records})
+    sums = np.zeros((len(ys), len(xs)))
+    counts = np.zeros((len(ys), len(xs)))
+    for r in records:
+        if r['scheduler'] == scheduler:
+            sums[ys.index(r[y]), xs.index(r[x])] += r['value']
+            counts[ys.index(r[y]), xs.index(r[x])] += 1
+    with np.errstate(invalid='ignore'):
+        return xs, ys, sums / counts
+
+
+def plot_heatmaps(records, x, y, schedulers, label, title=''):
+    '''
+    Draws the heatmaps of records, a list of dicts holding a value for
+    dimensions x and y, a 'scheduler' and a 'value', and returns the figure.
+    Values measured for the same cell (e.g. for different values of a third
+    dimension) are averaged.
+    '''
+    fig, axes = plt.subplots(1, len(schedulers) + 1, figsize=(4.5 * (len(schedulers) + 1), 4), squeeze=False)
+    axes = axes[0]
+
+    matrices = []
+    for ax, scheduler in zip(axes, schedulers):
+        xs, ys, matrix = cells(records, x, y, scheduler)
+        matrices.append(matrix)
+        image = ax.imshow(matrix, origin='lower', aspect='auto', cmap='viridis')
+        fig.colorbar(image, ax=ax, label=label)
+        ax.set_title(scheduler)
+
+    # Index of the scheduler with the lowest value in every cell, where all were measured.
+    stacked = np.stack(matrices)
+    measured = ~np.isnan(stacked).any(axis=0)
+    lowest = np.where(measured, np.argmin(np.nan_to_num(stacked, nan=np.inf), axis=0), np.nan)
+    axes[-1].imshow(lowest, origin='lower', aspect='auto', cmap=ListedColormap(COLORS[:len(schedulers)]),
+                    vmin=-0.5, vmax=len(schedulers) - 0.5)
+    axes[-1].legend(handles=[plt.Rectangle((0, 0), 1, 1, color=COLORS[i]) for i in range(len(schedulers))],
+                    labels=list(schedulers), loc='upper right', fontsize=8)
+    axes[-1].set_title(f'Lowest {label.lower()}')
+
+    for ax in axes:
+        ax.set_xticks(range(len(xs)), [str(v) for v in xs])
+        ax.set_yticks(range(len(ys)), [str(v) for v in ys])
+        ax.set_xlabel(x)
+        ax.set_ylabel(y)
+    fig.suptitle(title, fontsize=10)
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,164 @@
+# On-disk store of task set sweep results.
+# Every measurement is appended to an SQLite database as soon as it completes,
+# so an interrupted sweep can be resumed, and results of earlier sweeps can be
+# plotted and compared later.
+
+
+import json
+import sqlite3
+import threading
+import time
+
+
+def config_key(config):
+    # Task set configurations are identified by their canonical JSON encoding.
+    return json.dumps(config, sort_keys=True)
+
+
+class ResultStore:
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute('''
+                CREATE TABLE IF NOT EXISTS measurements (
+                    config TEXT NOT NULL,
+                    scheduler TEXT NOT NULL,
+                    workers INTEGER NOT NULL,
+                    iteration INTEGER NOT NULL,
+                    exe_time REAL NOT NULL,
+                    lfc_version TEXT,
+                    recorded_at REAL NOT NULL,
+                    PRIMARY KEY (config, scheduler, workers, iteration)
+                )''')
+            # Timing metrics of a measurement, as a JSON object (see analysis.METRICS).
+            self.db.execute('''
+                CREATE TABLE IF NOT EXISTS timing (
+                    config TEXT NOT NULL,
+                    scheduler TEXT NOT NULL,
+                    workers INTEGER NOT NULL,
+                    iteration INTEGER NOT NULL,
+                    metrics TEXT NOT NULL,
+                    PRIMARY KEY (config, scheduler, workers, iteration)
+                )''')
+            self.db.execute('''
+                CREATE TABLE IF NOT EXISTS build_failures (
+                    config TEXT NOT NULL,
+                    scheduler TEXT NOT NULL,
+                    workers INTEGER NOT NULL,
+                    error TEXT,
+                    lfc_version TEXT,
+                    recorded_at REAL NOT NULL
+                )''')
+            # Runs that crashed or did not report their execution time. They are
+            # not measured, so a resumed sweep runs them again, and a run that
+            # succeeds then removes its failure.
+            self.db.execute('''
+                CREATE TABLE IF NOT EXISTS run_failures (
+                    config TEXT NOT NULL,
+                    scheduler TEXT NOT NULL,
+                    workers INTEGER NOT NULL,
+                    iteration INTEGER NOT NULL,
+                    error TEXT,
+                    lfc_version TEXT,
+                    recorded_at REAL NOT NULL,
+                    PRIMARY KEY (config, scheduler, workers, iteration)
+                )''')
+
+    def record(self, config, measurement, lfc_version=None):
+        with self.lock, self.db:
+            self.db.execute('INSERT OR REPLACE INTO measurements VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (config_key(config), measurement.scheduler, measurement.workers,
+                             measurement.iteration, measurement.exe_time, lfc_version, time.time()))
+            if measurement.timing is not None:
+                self.db.execute('INSERT OR REPLACE INTO timing VALUES (?, ?, ?, ?, ?)',
+                                (config_key(config), measurement.scheduler, measurement.workers,
+                                 measurement.iteration, json.dumps(measurement.timing)))
+            self.db.execute('DELETE FROM run_failures WHERE config = ? AND scheduler = ? AND workers = ? '
+                            'AND iteration = ?', (config_key(config), measurement.scheduler,
+                                                  measurement.workers, measurement.iteration))
+
+    def record_failure(self, config, failure, lfc_version=None):
+        '''
+        Records a program that failed to build (a BuildFailure).
+        '''
+        with self.lock, self.db:
+            self.db.execute('INSERT INTO build_failures VALUES (?, ?, ?, ?, ?, ?)',
+                            (config_key(config), failure.scheduler, failure.workers,
+                             failure.error, lfc_version, time.time()))
+
+    def record_run_failure(self, config, failure, lfc_version=None):
+        '''
+        Records a run of a program that failed (a RunFailure), replacing an
+        earlier failure of the same iteration.
+        '''
+        with self.lock, self.db:
+            self.db.execute('INSERT OR REPLACE INTO run_failures VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (config_key(config), failure.scheduler, failure.workers, failure.iteration,
+                             failure.error, lfc_version, time.time()))
+
+    def clear(self, config):
+        '''
+        Removes all the measurements of a configuration, to measure it from scratch.
+        '''
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM measurements WHERE config = ?', (config_key(config),))
+            self.db.execute('DELETE FROM timing WHERE config = ?', (config_key(config),))
+            self.db.execute('DELETE FROM run_failures WHERE config = ?', (config_key(config),))
+
+    def measured(self, config):
+        '''
+        Returns the set of (scheduler, workers, iteration) already measured for
+        a configuration. Failed runs are not measured, so they are retried.
+        '''
+        with self.lock:
+            rows = self.db.execute('SELECT scheduler, workers, iteration FROM measurements WHERE config = ?',
+                                   (config_key(config),)).fetchall()
+        return set(rows)
+
+    def exe_times(self, config, schedulers=None):
+        '''
+        Returns a dict mapping (scheduler, workers) to the list of measured
+        execution times of a configuration, in iteration order.
+        '''
+        with self.lock:
+            rows = self.db.execute('SELECT scheduler, workers, exe_time FROM measurements WHERE config = ? '
+                                   'ORDER BY scheduler, workers, iteration', (config_key(config),)).fetchall()
+        samples = {}
+        for scheduler, workers, exe_time in rows:
+            if schedulers is None or scheduler in schedulers:
+                samples.setdefault((scheduler, workers), []).append(exe_time)
+        return samples
+
+    def timing(self, config, metric, schedulers=None):
+        '''
+        Returns a dict mapping (scheduler, workers) to the list of values of a
+        timing metric of a configuration, in iteration order. Runs for which
+        the metric is undefined are left out.
+        '''
+        with self.lock:
+            rows = self.db.execute('SELECT scheduler, workers, metrics FROM timing WHERE config = ? '
+                                   'ORDER BY scheduler, workers, iteration', (config_key(config),)).fetchall()
+        samples = {}
+        for scheduler, workers, metrics in rows:
+            value = json.loads(metrics).get(metric)
+            if value is not None and (schedulers is None or scheduler in schedulers):
+                samples.setdefault((scheduler, workers), []).append(value)
+        return samples
+
+    def samples(self, config, metric='exe_time', schedulers=None):
+        '''
+        Returns the values of either the execution time or a timing metric,
+        as exe_times() and timing() do.
+        '''
+        if metric == 'exe_time':
+            return self.exe_times(config, schedulers)
+        return self.timing(config, metric, schedulers)
+
+    def configs(self):
+        with self.lock:
+            rows = self.db.execute('SELECT DISTINCT config FROM measurements').fetchall()
+        return [json.loads(config) for config, in rows]
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,667 @@
+# Sweep engine for the task set generator.
+# It generates an LF program for every (scheduler, number of workers) pair,
+# builds it, and runs the resulting binaries on a pool of concurrent jobs,
+# streaming each measurement back as soon as it finishes.
+#
+# It can also be run without the GUI, e.g. on a headless benchmark host:
+#
+#     python3 -m sweep example_sweep.json --output results.jsonl
+#
+# See README.md for the format of the sweep specification.
+
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import analysis
+import design
+from build_cache import BuildCache, lfc_version
+from results import ResultStore
+
+SCHEDULERS = ['NP', 'GEDF_NP', 'GEDF_NP_CI']
+
+# One execution of one generated program. timing holds the metrics computed
+# by analysis.summarize() from the output of the run, if it was analyzed.
+Measurement = namedtuple('Measurement', ['scheduler', 'workers', 'iteration', 'exe_time', 'timing'],
+                         defaults=(None,))
+
+# A generated program that could not be built.
+BuildFailure = namedtuple('BuildFailure', ['scheduler', 'workers', 'error'])
+
+# An execution of a generated program that crashed or did not report its
+# elapsed physical time.
+RunFailure = namedtuple('RunFailure', ['scheduler', 'workers', 'iteration', 'error'])
+
+
+class BuildError(Exception):
+    pass
+
+
+def task_set(num_tasks, total_time, utilization, periodic, period, logging=True):
+    '''
+    Returns the template placeholders describing a task set. Times are LF
+    time values such as "1 sec"; the scheduler and number of workers are
+    filled in per generated program. Without logging, the tasks do not print
+    their release and finish times, which leaves stdout I/O out of the
+    measured execution time (but also leaves nothing to analyze).
+    '''
+    return {
+        '$SCHEDULER_TYPE$': '',
+        '$NUM_TASKS$': str(num_tasks),
+        '$TOTAL_TIME$': total_time,
+        '$UTILIZATION$': str(utilization),
+        '$NUM_WORKERS$': '',
+        '$PERIODIC$': 'true' if periodic else 'false',
+        '$PERIOD$': period,
+        '$TASK_LOGGING$': '1' if logging else '0'
+    }
+
+
+def substitute(template, replacements):
+    contents = template
+    for key, value in replacements.items():
+        contents = contents.replace(key, value)
+    return contents
+
+
+def program(template, replacements, scheduler_type, num_workers):
+    '''
+    Returns the template with its placeholders substituted for the given
+    scheduler and number of workers.
+    '''
+    replacements = dict(replacements)
+    replacements['$SCHEDULER_TYPE$'] = scheduler_type
+    replacements['$NUM_WORKERS$'] = str(num_workers)
+    return substitute(template, replacements)
+
+
+def generate(contents, scheduler_type, num_workers, working_dir):
+    '''
+    Writes a generated program to the .gui/src directory and returns its file name.
+    '''
+    filename = f'practice_{scheduler_type}_{num_workers}'
+    filepath = f'{working_dir}/.gui/src/{filename}.lf'
+    with open(filepath, "w") as lf_file:
+        lf_file.write(contents)
+    print(f"File saved: {filepath}")
+    return filename
+
+
+def prepare_working_dir(working_dir, lf_path):
+    '''
+    Recreates the directory for generated sources under working_dir and
+    returns the build cache kept next to it.
+    '''
+    # Generated sources are recreated on every run, but built binaries are kept in
+    # .gui/cache so that unchanged programs are not recompiled after a restart.
+    if os.path.isdir(f'{working_dir}/.gui/src'):
+        shutil.rmtree(f'{working_dir}/.gui/src')
+    os.makedirs(f'{working_dir}/.gui/src')
+    return BuildCache(f'{working_dir}/.gui/cache', lfc_version(lf_path))
+
+
+def binary_path(filepath):
+    # lfc places the binary for <dir>/src/<name>.lf in <dir>/bin/<name>.
+    src_dir, filename = os.path.split(filepath)
+    return os.path.join(os.path.dirname(src_dir), 'bin', os.path.splitext(filename)[0])
+
+
+def build_batch(filepaths, lf_path, on_start=None):
+    '''
+    Compiles all the given LF files with a single lfc invocation, run through
+    Gradle, whose daemon (enabled by default) keeps the JVM and the Gradle
+    configuration across invocations. on_start, if given, is called with the
+    Popen object of every build once it has started, e.g. to terminate it.
+
+    lfc may stop at the first file that fails, leaving the following ones
+    unbuilt, so if a batch fails, the files that were not built are compiled
+    again one at a time before being reported as failed.
+
+    Returns a dict mapping each file to None if its binary was built, or to
+    the compiler messages concerning it otherwise.
+    '''
+    # Whether a file was built is decided by the presence of its binary,
+    # so stale binaries from earlier builds are removed first.
+    for filepath in filepaths:
+        if os.path.exists(binary_path(filepath)):
+            os.remove(binary_path(filepath))
+
+    # Gradle splits --args like a shell would, so paths with spaces are quoted.
+    args = ' '.join(shlex.quote(filepath) for filepath in filepaths)
+    with subprocess.Popen(['./gradlew', 'runLfc', '--args', args],
+                          cwd=lf_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as lfc:
+        if on_start is not None:
+            on_start(lfc)
+        stdout, stderr = lfc.communicate()
+    output = (stdout.decode("utf-8") + stderr.decode("utf-8")).split('\n')
+
+    results = {}
+    for filepath in filepaths:
+        if os.path.exists(binary_path(filepath)):
+            results[filepath] = None
+            print(f"Built Successfully: {filepath}")
+            continue
+        if len(filepaths) > 1:
+            results.update(build_batch([filepath], lf_path, on_start))
+            continue
+        messages = [line for line in output if os.path.basename(filepath) in line]
+        if not messages:
+            messages = output[-20:]
+        results[filepath] = '\n'.join(messages)
+        print(f"Build Failed: {filepath}")
+    return results
+
+
+def build(filepath, lf_path):
+    error = build_batch([filepath], lf_path)[filepath]
+    if error is not None:
+        raise BuildError(error)
+
+
+def run(binary, cpus=None, parser=None, on_start=None):
+    '''
+    Runs a generated binary and returns its elapsed physical time in seconds.
+    The output of the binary is read line by line as it is produced, and fed
+    to parser if one is given. If cpus is given, the binary (and every worker
+    thread it spawns) is pinned to that set of CPUs. on_start, if given, is
+    called with the Popen object of the binary once it has started.
+    '''
+    command = [binary]
+    if cpus is not None:
+        command = ['taskset', '-c', ','.join(str(cpu) for cpu in cpus)] + command
+
+    exe_time = None
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          text=True, encoding="utf-8", errors="replace") as lf_out:
+        if on_start is not None:
+            on_start(lf_out)
+        for line in lf_out.stdout:
+            line = line.rstrip('\n')
+            if line.startswith("---- Elapsed physical"):
+                exe_time = line.split(' ')[-1]
+            elif parser is not None:
+                parser.feed(line)
+
+    if exe_time is None:
+        raise RuntimeError(f"{binary} did not report its elapsed physical time")
+    return int(exe_time.replace(',', '')) / 1000000000
+
+
+def available_cpus():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class CpuAllocator:
+    '''
+    Hands out disjoint sets of CPUs to concurrently running binaries so that
+    timing-sensitive runs do not compete for the same cores.
+    '''
+    def __init__(self, cpus):
+        self.free = list(cpus)
+        self.total = len(self.free)
+        self.condition = threading.Condition()
+
+    def acquire(self, count):
+        # A program with more workers than CPUs gets the whole machine.
+        count = max(1, min(count, self.total))
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.free) >= count)
+            cpus, self.free = self.free[:count], self.free[count:]
+            return cpus
+
+    def release(self, cpus):
+        with self.condition:
+            self.free.extend(cpus)
+            self.free.sort()
+            self.condition.notify_all()
+
+
+class Sweep:
+    '''
+    Runs every (scheduler, workers, iteration) job of a sweep, except the
+    ones listed in skip (e.g. because they have already been measured).
+
+    With batch_build, all programs are compiled by a single lfc invocation
+    before any of them runs. Otherwise, programs are built one at a time
+    (Gradle serializes builds of the same project anyway), and each program's
+    iterations are queued for execution as soon as its build finishes.
+    Either way, builds go through Gradle's persistent daemon.
+    If a BuildCache is given, programs whose
+    contents have been built before reuse the cached binary. Up to
+    max_parallel binaries run at the same time; with pin_cpus, each one is
+    pinned to its own set of cores, one per LF worker.
+
+    With analyze, the output of every run is analyzed into per-release
+    response times, and periodic tasks are checked against a deadline equal
+    to their period. There is nothing to analyze if task logging is off.
+
+    With target_ci, num_iterations is only the minimum number of iterations:
+    a program keeps being run, one iteration at a time, until the confidence
+    interval of its mean execution time is within target_ci (relative to the
+    mean), or until it has been run max_iterations times. history gives the
+    execution times already measured for each (scheduler, workers), e.g. by
+    an earlier run of the sweep.
+
+    A sweep can be cancelled from another thread with cancel().
+    '''
+    def __init__(self, template, replacements, working_dir, lf_path,
+                 schedulers, workers, num_iterations, max_parallel=1, pin_cpus=False, cache=None, batch_build=True,
+                 skip=(), analyze=True, target_ci=None, confidence=0.95, max_iterations=None, history=None):
+        self.template = template
+        self.replacements = replacements
+        self.working_dir = working_dir
+        self.lf_path = lf_path
+        self.schedulers = schedulers
+        self.workers = workers
+        self.num_iterations = num_iterations
+        self.max_parallel = max(1, max_parallel)
+        self.cache = cache
+        self.batch_build = batch_build
+        self.skip = set(skip)
+        self.analyze = analyze and replacements['$TASK_LOGGING$'] == '1'
+        self.deadline = None
+        if replacements['$PERIODIC$'] == 'true':
+            self.deadline = analysis.time_value(replacements['$PERIOD$'])
+        self.target_ci = target_ci
+        self.confidence = confidence
+        self.max_iterations = max(max_iterations or num_iterations, num_iterations)
+        self.samples = {(scheduler, worker): list((history or {}).get((scheduler, worker), []))
+                        for scheduler in schedulers for worker in workers}
+        self.next_iteration = {p: max([num_iterations - 1] + [i for s, w, i in self.skip if (s, w) == p]) + 1
+                               for p in self.samples}
+        # Keys of the cached binaries of this sweep, which must not be evicted while it runs
+        self.cache_keys = set()
+        self.cancelled = threading.Event()
+        self.processes = set()
+        self.processes_lock = threading.Lock()
+        self.cpus = None
+        if pin_cpus:
+            if shutil.which('taskset') is None:
+                print("Warning: 'taskset' not found, running without CPU pinning.")
+            else:
+                self.cpus = CpuAllocator(available_cpus())
+
+    def iterations(self, scheduler, num_workers):
+        return [i for i in range(self.num_iterations) if (scheduler, num_workers, i) not in self.skip]
+
+    def needs_more(self, scheduler, num_workers):
+        '''
+        Returns whether adaptive sampling should run another iteration of a program.
+        '''
+        samples = self.samples[(scheduler, num_workers)]
+        return self.target_ci is not None and len(samples) < self.max_iterations and \
+            not analysis.converged(samples, self.target_ci, self.confidence)
+
+    def programs(self):
+        '''
+        Returns the (scheduler, workers) programs that still have iterations to run.
+        '''
+        return [(scheduler, worker) for scheduler in self.schedulers for worker in self.workers
+                if self.iterations(scheduler, worker) or self.needs_more(scheduler, worker)]
+
+    def program_jobs(self, scheduler, num_workers):
+        '''
+        Returns the number of jobs of a program left to run; with adaptive
+        sampling, an upper bound.
+        '''
+        if self.target_ci is None:
+            return len(self.iterations(scheduler, num_workers))
+        return max(len(self.iterations(scheduler, num_workers)),
+                   self.max_iterations - len(self.samples[(scheduler, num_workers)]))
+
+    def num_jobs(self):
+        '''
+        Returns the number of jobs left to run; with adaptive sampling, an upper bound.
+        '''
+        return sum(self.program_jobs(*p) for p in self.programs())
+
+    def cached_binary(self, scheduler, num_workers):
+        if self.cache is None:
+            return None
+        contents = program(self.template, self.replacements, scheduler, num_workers)
+        key = self.cache.key(contents)
+        binary = self.cache.get(key)
+        if binary is not None:
+            self.cache_keys.add(key)
+            print(f"Using cached binary for {scheduler} with {num_workers} workers: {binary}")
+        return binary
+
+    def build_programs(self, programs):
+        '''
+        Builds the given (scheduler, workers) programs with a single lfc
+        invocation. Returns a dict mapping each program that was built to its
+        binary, and a dict mapping each program that failed to its error.
+        '''
+        filepaths = {}
+        for scheduler, num_workers in programs:
+            contents = program(self.template, self.replacements, scheduler, num_workers)
+            filename = generate(contents, scheduler, num_workers, self.working_dir)
+            filepaths[(scheduler, num_workers)] = (f'{self.working_dir}/.gui/src/{filename}.lf', contents)
+
+        try:
+            results = build_batch([filepath for filepath, _ in filepaths.values()], self.lf_path,
+                                  on_start=self.started)
+        finally:
+            self.forget_finished()
+        binaries = {}
+        failures = {}
+        for key, (filepath, contents) in filepaths.items():
+            if results[filepath] is not None:
+                failures[key] = f'{filepath}:\n{results[filepath]}'
+                continue
+            binaries[key] = binary_path(filepath)
+            if self.cache is not None:
+                cache_key = self.cache.key(contents)
+                self.cache_keys.add(cache_key)
+                binaries[key] = self.cache.put(cache_key, binaries[key])
+        return binaries, failures
+
+    def build_program(self, scheduler, num_workers):
+        binary = self.cached_binary(scheduler, num_workers)
+        if binary is not None:
+            return binary
+        binaries, failures = self.build_programs([(scheduler, num_workers)])
+        if failures:
+            raise BuildError(failures[(scheduler, num_workers)])
+        return binaries[(scheduler, num_workers)]
+
+    def cancel(self):
+        '''
+        Stops the sweep: no more jobs are started, and running builds and
+        binaries are terminated.
+        '''
+        self.cancelled.set()
+        with self.processes_lock:
+            for process in self.processes:
+                process.terminate()
+
+    def started(self, process):
+        with self.processes_lock:
+            self.processes.add(process)
+            if self.cancelled.is_set():
+                process.terminate()
+
+    def forget_finished(self):
+        with self.processes_lock:
+            self.processes = {p for p in self.processes if p.poll() is None}
+
+    def run_program(self, scheduler, num_workers, iteration, binary):
+        if self.cancelled.is_set():
+            return None
+        cpus = self.cpus.acquire(num_workers) if self.cpus else None
+        parser = analysis.ReleaseParser() if self.analyze else None
+        try:
+            exe_time = run(binary, cpus, parser, on_start=self.started)
+        except (RuntimeError, OSError) as e:
+            return RunFailure(scheduler, num_workers, iteration, f'{binary}: {e}')
+        finally:
+            self.forget_finished()
+            if cpus is not None:
+                self.cpus.release(cpus)
+        timing = None
+        if parser is not None:
+            timing = analysis.summarize(parser.releases(), exe_time * 1000000000, num_workers, self.deadline)
+        return Measurement(scheduler, num_workers, iteration, exe_time, timing)
+
+    def run(self):
+        '''
+        Generator yielding a Measurement for every job, in completion order,
+        a BuildFailure for every program that fails to build, and a
+        RunFailure for every job whose binary fails. The other jobs of the
+        sweep still run when one of them fails, but adaptive sampling stops
+        running a program that failed. Once the sweep is cancelled, nothing
+        more is yielded.
+        '''
+        try:
+            with ThreadPoolExecutor(max_workers=1) as builder, \
+                    ThreadPoolExecutor(max_workers=self.max_parallel) as runners:
+                binaries = {}
+                outstanding = {}
+                failed = set()
+
+                def submit_runs(scheduler, num_workers, binary, iterations):
+                    # Adaptive sampling continues with a single extra iteration at a time.
+                    key = (scheduler, num_workers)
+                    binaries[key] = binary
+                    if not iterations:
+                        iterations = [self.next_iteration[key]]
+                        self.next_iteration[key] += 1
+                    outstanding[key] = len(iterations)
+                    return {runners.submit(self.run_program, scheduler, num_workers, i, binary)
+                            for i in iterations}
+
+                pending = set()
+                builds = {}
+                if self.batch_build:
+                    built = {}
+                    for scheduler, num_workers in self.programs():
+                        binary = self.cached_binary(scheduler, num_workers)
+                        if binary is not None:
+                            built[(scheduler, num_workers)] = binary
+                    missing = [p for p in self.programs() if p not in built]
+                    if missing:
+                        if self.cancelled.is_set():
+                            return
+                        binaries_built, failures = self.build_programs(missing)
+                        # A build terminated by cancel() fails, but is not reported.
+                        if self.cancelled.is_set():
+                            return
+                        built.update(binaries_built)
+                        for (scheduler, num_workers), error in failures.items():
+                            yield BuildFailure(scheduler, num_workers, error)
+                    for (scheduler, num_workers), binary in built.items():
+                        pending |= submit_runs(scheduler, num_workers, binary, self.iterations(scheduler, num_workers))
+                else:
+                    builds = {builder.submit(self.build_program, scheduler, num_workers): (scheduler, num_workers)
+                              for scheduler, num_workers in self.programs()}
+                    pending = set(builds)
+                try:
+                    while pending and not self.cancelled.is_set():
+                        # Wake up regularly to notice cancellation.
+                        done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                        if self.cancelled.is_set():
+                            break
+                        for future in done:
+                            if future in builds:
+                                scheduler, num_workers = builds[future]
+                                try:
+                                    pending |= submit_runs(scheduler, num_workers, future.result(),
+                                                           self.iterations(scheduler, num_workers))
+                                except (BuildError, OSError) as e:
+                                    yield BuildFailure(scheduler, num_workers, str(e))
+                            else:
+                                result = future.result()
+                                key = (result.scheduler, result.workers)
+                                if isinstance(result, RunFailure):
+                                    failed.add(key)
+                                else:
+                                    self.samples[key].append(result.exe_time)
+                                outstanding[key] -= 1
+                                if outstanding[key] == 0 and key not in failed and self.needs_more(*key):
+                                    pending |= submit_runs(*key, binaries[key], [])
+                                yield result
+                finally:
+                    for future in pending:
+                        future.cancel()
+        finally:
+            # Once the sweep has stopped, its binaries may be evicted again.
+            if self.cache is not None:
+                self.cache.release(self.cache_keys)
+
+
+def load_spec(path):
+    '''
+    Reads a sweep specification from a JSON file, or from a YAML file if
+    PyYAML is installed.
+    '''
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                sys.exit("Import Error: Failed to import 'yaml'. Try 'pip3 install pyyaml' or use a JSON spec")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def spec_configs(spec):
+    '''
+    Returns the (task set configuration, workers) pairs to sweep, sampled
+    from the dimensions of spec that are given as lists or ranges.
+    '''
+    fixed = {'total_time': spec.get('total_time', '1 sec'), 'logging': spec.get('logging', True)}
+    space = {
+        'num_tasks': spec.get('num_tasks', 20),
+        'utilization': spec.get('utilization', 0.6),
+        'periodic': spec.get('periodic', False),
+        'period': spec.get('period', '100 msec'),
+        'workers': spec.get('workers', {'from': 1, 'to': 20}),
+    }
+    sampling = spec.get('sampling', {})
+    points = design.sample(space, sampling.get('strategy', 'grid'), sampling.get('samples'), sampling.get('seed'))
+    # The period of sporadic tasks is unused, so they are all run with the same one.
+    for point in points:
+        if not point['periodic']:
+            point['period'] = design.levels(space['period'])[0]
+    return [(dict(fixed, **config), workers) for config, workers in design.configs(points)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a task set scheduler sweep without the GUI.")
+    parser.add_argument('spec', help="JSON (or YAML) sweep specification")
+    parser.add_argument('--output', default='-', help="file to write the results to (default: stdout)")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl', help="format of the results")
+    parser.add_argument('--lf-path', default=os.getenv("LF_PATH"), help="Lingua Franca installation (default: $LF_PATH)")
+    parser.add_argument('--working-dir', default=os.getcwd(), help="directory for generated files (default: cwd)")
+    parser.add_argument('--template', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         'BasicTaskSetGeneratorTemplate.lf'))
+    parser.add_argument('--store', help="SQLite result store (default: <working dir>/.gui/results.db)")
+    parser.add_argument('--fresh', action='store_true',
+                        help="discard stored results of the swept configurations instead of resuming")
+    parser.add_argument('--heatmap', help="image file to draw heatmaps of the results to")
+    args = parser.parse_args(argv)
+    if args.lf_path is None:
+        sys.exit("Set the environment variable LF_PATH to the path where Lingua Franca is installed")
+
+    spec = load_spec(args.spec)
+    configs = spec_configs(spec)
+    with open(args.template) as f:
+        template = f.read()
+
+    working_dir = os.path.abspath(args.working_dir)
+    lf_path = os.path.abspath(args.lf_path)
+    cache = prepare_working_dir(working_dir, lf_path)
+    store = ResultStore(args.store or f'{working_dir}/.gui/results.db')
+    schedulers = spec.get('schedulers', SCHEDULERS)
+    adaptive = spec.get('adaptive', {})
+    confidence = adaptive.get('confidence', 0.95)
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    fields = list(configs[0][0]) + list(Measurement._fields[:-1]) + analysis.METRICS
+    writer = csv.DictWriter(out, fieldnames=fields) if args.format == 'csv' else None
+    if writer:
+        writer.writeheader()
+    failed = False
+    try:
+        for number, (config, workers) in enumerate(configs, start=1):
+            print(f"Configuration {number}/{len(configs)}: {config}, workers {workers}", file=sys.stderr)
+            if args.fresh:
+                store.clear(config)
+            sweep = Sweep(template, task_set(**config), working_dir, lf_path,
+                          schedulers, workers,
+                          spec.get('iterations', 1), max_parallel=spec.get('parallel', 1),
+                          pin_cpus=spec.get('pin_cpus', False), cache=cache,
+                          batch_build=spec.get('batch_build', True), skip=store.measured(config),
+                          target_ci=adaptive.get('target'), confidence=confidence,
+                          max_iterations=adaptive.get('max_iterations'), history=store.exe_times(config, schedulers))
+
+            # Progress messages go to stderr so that stdout only carries results.
+            with contextlib.redirect_stdout(sys.stderr):
+                for result in sweep.run():
+                    if isinstance(result, BuildFailure):
+                        print(f"Build Failed\n{result.error}", file=sys.stderr)
+                        store.record_failure(config, result, cache.version)
+                        failed = True
+                        continue
+                    if isinstance(result, RunFailure):
+                        print(f"Run Failed: {result.scheduler}, {result.workers} workers, iteration {result.iteration}\n"
+                              f"{result.error}", file=sys.stderr)
+                        store.record_run_failure(config, result, cache.version)
+                        failed = True
+                        continue
+                    store.record(config, result, cache.version)
+                    row = dict(config, **result._asdict())
+                    if writer:
+                        # CSV rows carry the timing metrics as columns of their own.
+                        timing = row.pop('timing') or {}
+                        writer.writerow(dict(row, **timing))
+                    else:
+                        out.write(json.dumps(row) + '\n')
+                    out.flush()
+
+            # Report the statistics of every point, including points measured by earlier runs.
+            for (scheduler, num_workers), samples in store.exe_times(config, schedulers).items():
+                if num_workers not in workers:
+                    continue
+                summary = analysis.describe(samples, confidence)
+                print(f"{scheduler}, {num_workers} workers: n={summary['n']}, mean={summary['mean']:.6g} sec, "
+                      f"median={summary['median']:.6g}, p95={summary['p95']:.6g}, stddev={summary['stddev']:.6g}, "
+                      f"{confidence:.0%} CI=+/-{summary['ci']:.6g}", file=sys.stderr)
+
+        if args.heatmap:
+            save_heatmap(args.heatmap, spec.get('heatmap', {}), store, configs, schedulers)
+    finally:
+        store.close()
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failed else 0
+
+
+def heatmap_records(store, configs, schedulers, metric='exe_time'):
+    '''
+    Returns the mean of a metric for every swept (configuration, scheduler,
+    workers) point, as records for heatmap.plot_heatmaps().
+    '''
+    records = []
+    for config, workers in configs:
+        for (scheduler, num_workers), samples in store.samples(config, metric, schedulers).items():
+            if num_workers in workers:
+                records.append(dict(config, scheduler=scheduler, workers=num_workers,
+                                    value=sum(samples) / len(samples)))
+    return records
+
+
+def save_heatmap(path, options, store, configs, schedulers):
+    import matplotlib
+    matplotlib.use('Agg')
+    import heatmap
+
+    # By default, plot against the number of workers and the first other dimension that varies.
+    varying = [d for d in design.CONFIG_DIMENSIONS if len({str(c[d]) for c, _ in configs}) > 1]
+    x = options.get('x', 'workers')
+    y = options.get('y', varying[0] if varying else 'utilization')
+    metric = options.get('metric', 'exe_time')
+    records = heatmap_records(store, configs, schedulers, metric)
+    if not records:
+        print("No results to plot", file=sys.stderr)
+        return
+    fig = heatmap.plot_heatmaps(records, x, y, [s for s in schedulers if any(r['scheduler'] == s for r in records)],
+                                metric)
+    fig.savefig(path)
+    print(f"Heatmap saved: {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
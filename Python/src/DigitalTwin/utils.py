@@ -1,21 +1,59 @@
+import collections
+import csv
 import curses
 
 class Logger:
-    def __init__(self, max_lines=3):
+    """
+    Keeps the last max_lines log records, e.g., (elapsed physical time, elapsed
+    logical time, microstep, remote, state), as given to append_log. Records are
+    only formatted, with format_record, when get_log is called, so logging an
+    event costs the same however long its message is. If spill_file is set, every
+    record is also appended to it as a CSV row, under a header of the field names,
+    and the file is flushed each time the log is shown.
+    """
+    def __init__(self, format_record=str, max_lines=3, spill_file=None, fields=None):
+        self.format_record = format_record
         self.max_lines = max_lines
-        self.log = []
+        self.log = collections.deque(maxlen=max_lines)
+        # Formatted records, or None for the records that have not been shown yet
+        self.lines = collections.deque(maxlen=max_lines)
+        self.spill = None
+        if spill_file:
+            self.spill_file = open(spill_file, "w", newline="")
+            self.spill = csv.writer(self.spill_file)
+            if fields:
+                self.spill.writerow(fields)
+
+    def append_log(self, *record):
+        self.log.append(record)
+        self.lines.append(None)
+        if self.spill is not None:
+            self.spill.writerow(record)
 
-    def append_log(self, msg):
-        self.log.append(msg)
-        if len(self.log) > self.max_lines:
-            self.log.pop(0)
-    
     def get_log(self):
-        return self.log
+        # The records spilled since the last time the log was shown are flushed
+        # together, so that they are not lost if the program is killed
+        self.flush()
+        for i, line in enumerate(self.lines):
+            if line is None:
+                self.lines[i] = self.format_record(self.log[i])
+        return list(self.lines)
+
+    def get_records(self):
+        return list(self.log)
 
     def log_size(self):
         return len(self.log)
 
+    def flush(self):
+        if self.spill is not None:
+            self.spill_file.flush()
+
+    def close(self):
+        if self.spill is not None:
+            self.spill_file.close()
+            self.spill = None
+
 
 class Window:
     def __init__(self):
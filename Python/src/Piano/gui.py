@@ -1,15 +1,14 @@
 import multiprocessing
-from multiprocessing import Process, connection
-from threading import Thread
+from multiprocessing import connection
+from threading import Thread, Lock
+import struct
+import time
 import sys
 import os
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 
-try:
-    import pygame
-except:
-    print("Import Error: Failed to import 'pygame'. Try 'pip3 install pygame'")
-    sys.exit(1)
+# pygame is only imported by the pygame process, see import_pygame()
+pygame = None
 
 
 # sound font and the picture of the keyboard
@@ -24,14 +23,52 @@ WHITE_KEYS = ["C", "D", "E", "F", "G", "A", "B"]
 # names of black keys
 BLACK_KEYS = ["C#", "D#", "F#", "G#", "A#"]
 
-def start_gui(piano_keys):
+# redraws per second at most, when the refresh rate of the display is unknown
+DEFAULT_REFRESH_RATE = 60
+
+# layout of the black keys in keys.png, in pixels: the size of the image,
+# the x-coordinate of each black key, and the size of a black key.
+# The keys are scaled with the image if it is replaced.
+KEYS_PNG_WIDTH = 225
+KEYS_PNG_HEIGHT = 130
+BLACK_KEY_OFFSETS = [18, 58, 115, 151, 187]
+BLACK_KEY_SIZE = (19, 68)
+
+# names of the keys of an octave, in order. The keys of the piano are numbered
+# in this order from the lowest one, e.g., ("D#", 1) is key 15.
+NOTES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+
+# messages from the pygame process to the LF program, in a fixed binary layout
+# whose first byte is the type of the message. Times are from time.monotonic_ns().
+KEY_EVENT = 1
+DRAWN_EVENT = 2
+READY_EVENT = 3
+# key event: type, key down, character (as a Unicode code point, 0 if none), time
+KEY_EVENT_STRUCT = struct.Struct("<B?IQ")
+# report that a graphics update was drawn: type, update id, time,
+# or that the piano is shown and can be played: type, 0, time
+DRAWN_EVENT_STRUCT = struct.Struct("<BIQ")
+
+# first message from the LF program: for each keyboard key playing a note, the
+# character of the key (as a Unicode code point) and the number of the note
+PIANO_KEY_STRUCT = struct.Struct("<IH")
+# graphics update from the LF program: update id, followed by the bitmask of the
+# pressed keys, little endian, in as many bytes as the keys of the piano need
+GRAPHICS_UPDATE_STRUCT = struct.Struct("<I")
+KEY_MASK_BYTES = (len(NOTES) * OCTAVES + 7) // 8
+
+def start_gui():
     '''
     Spawns a process to run the pygame piano.
+        The process imports pygame and loads the keyboard image and the font while the
+        LF program starts up, and waits for the keyboard characters of the piano keys
+        (see send_piano_keys). It reports that the piano can be played once it is shown
+        (see pack_ready_event). The process is started with its own multiprocessing
+        context, so this can be called whatever the start method of the program is.
 
     Parameters
     ----------
-    piano_keys: dict[str] -> tuple(str, int)
-        a mapping of keyboard characters to piano notes.
+    None
 
     Returns
     ----------
@@ -41,15 +78,310 @@ def start_gui(piano_keys):
     multiprocessing.connection.PipeConnection
         a pipe object for the LF program to send graphics update to the pygame process
     '''
-    multiprocessing.set_start_method("spawn")
     user_input_pout, user_input_pin = connection.Pipe(duplex=False)
     update_graphics_pout, update_graphics_pin = connection.Pipe(duplex=False)
-    p = Process(target=gui, args=(user_input_pin, update_graphics_pout, piano_keys))
+    p = multiprocessing.get_context("spawn").Process(target=gui, args=(user_input_pin, update_graphics_pout))
     p.start()
+    # the ends of the pygame process are only kept open by it, so that the LF
+    # program receives EOFError if it stops
+    user_input_pin.close()
+    update_graphics_pout.close()
     return user_input_pout, update_graphics_pin
 
 
-def gui(user_input_pin, update_graphics_pout, piano_keys):
+def pack_graphics_update(update_id, pressed_keys):
+    '''
+    Encodes a graphics update for the pygame process.
+
+    Parameters
+    ----------
+    update_id: int
+        the id of the update.
+    pressed_keys: int
+        the bitmask of the pressed keys (see note_to_bit).
+
+    Returns
+    ----------
+    bytes
+        the message.
+    '''
+    return GRAPHICS_UPDATE_STRUCT.pack(update_id) + pressed_keys.to_bytes(KEY_MASK_BYTES, "little")
+
+
+def unpack_graphics_update(data):
+    '''
+    Decodes a graphics update from the LF program, see pack_graphics_update.
+
+    Parameters
+    ----------
+    data: bytes
+        the message.
+
+    Returns
+    ----------
+    int
+        the id of the update.
+    int
+        the bitmask of the pressed keys.
+    '''
+    (update_id,) = GRAPHICS_UPDATE_STRUCT.unpack_from(data)
+    return update_id, int.from_bytes(data[GRAPHICS_UPDATE_STRUCT.size:], "little")
+
+
+def send_piano_keys(update_graphics_pin, piano_keys):
+    '''
+    Sends the keyboard characters of the piano keys to the pygame process. This is
+        the first message it expects.
+
+    Parameters
+    ----------
+    update_graphics_pin: multiprocessing.connection.PipeConnection
+        the pipe object returned by start_gui to send graphics update to the pygame process.
+    piano_keys: dict[str] -> tuple(str, int)
+        a mapping of keyboard characters to piano notes.
+
+    Returns
+    ----------
+    None
+    '''
+    update_graphics_pin.send_bytes(b"".join(PIANO_KEY_STRUCT.pack(ord(c), note_to_bit(note).bit_length() - 1)
+                                            for c, note in piano_keys.items()))
+
+
+def receive_piano_keys(update_graphics_pout):
+    '''
+    Receives the keyboard characters of the piano keys from the LF program, see send_piano_keys.
+
+    Parameters
+    ----------
+    update_graphics_pout: multiprocessing.connection.PipeConnection
+        a pipe object for the pygame piano to receive acutations from the LF program.
+
+    Returns
+    ----------
+    dict[str] -> tuple(str, int)
+        a mapping of keyboard characters to piano notes.
+    '''
+    piano_keys = {}
+    for code_point, key in PIANO_KEY_STRUCT.iter_unpack(update_graphics_pout.recv_bytes()):
+        piano_keys[chr(code_point)] = (NOTES[key % len(NOTES)], key // len(NOTES))
+    return piano_keys
+
+
+def import_pygame():
+    '''
+    Imports pygame in the pygame process. The LF program only uses this module to
+        start the pygame process and to encode and decode messages, so it does not
+        pay for importing pygame.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    ----------
+    None
+    '''
+    global pygame
+    try:
+        import pygame
+    except:
+        print("Import Error: Failed to import 'pygame'. Try 'pip3 install pygame'")
+        sys.exit(1)
+
+
+def note_to_bit(note):
+    '''
+    Finds the bit of a note in the bitmask of pressed keys of a graphics update.
+
+    Parameters
+    ----------
+    note: tuple(str, int)
+        the note (Ex. ("D#", 1)).
+
+    Returns
+    ----------
+    int
+        the bitmask with only the bit of the note set.
+    '''
+    name, octave = note
+    return 1 << (octave * len(NOTES) + NOTES.index(name))
+
+
+def bits_to_notes(bits):
+    '''
+    Finds the notes whose bit is set in a bitmask of pressed keys.
+
+    Parameters
+    ----------
+    bits: int
+        the bitmask.
+
+    Returns
+    ----------
+    set(tuple(str, int))
+        the notes.
+    '''
+    notes = set()
+    while bits:
+        key = (bits & -bits).bit_length() - 1
+        notes.add((NOTES[key % len(NOTES)], key // len(NOTES)))
+        bits &= bits - 1
+    return notes
+
+
+def pack_key_event(key_down, character, time_ns):
+    '''
+    Encodes a key event for the LF program.
+
+    Parameters
+    ----------
+    key_down: bool
+        True if the key was pressed, False if it was released.
+    character: str
+        the character of the key, or "" if it has none.
+    time_ns: int
+        the time of the event.
+
+    Returns
+    ----------
+    bytes
+        the message.
+    '''
+    return KEY_EVENT_STRUCT.pack(KEY_EVENT, key_down, ord(character[0]) if character else 0, time_ns)
+
+
+def pack_drawn_event(update_id, time_ns):
+    '''
+    Encodes a report that a graphics update was drawn, for the LF program.
+
+    Parameters
+    ----------
+    update_id: int
+        the id of the graphics update.
+    time_ns: int
+        the time it was drawn.
+
+    Returns
+    ----------
+    bytes
+        the message.
+    '''
+    return DRAWN_EVENT_STRUCT.pack(DRAWN_EVENT, update_id, time_ns)
+
+
+def pack_ready_event(time_ns):
+    '''
+    Encodes a report that the piano is shown and can be played, for the LF program.
+
+    Parameters
+    ----------
+    time_ns: int
+        the time it was shown.
+
+    Returns
+    ----------
+    bytes
+        the message.
+    '''
+    return DRAWN_EVENT_STRUCT.pack(READY_EVENT, 0, time_ns)
+
+
+def unpack_user_input(data):
+    '''
+    Decodes a message from the pygame process.
+
+    Parameters
+    ----------
+    data: bytes
+        the message.
+
+    Returns
+    ----------
+    tuple
+        either a key event, ("key", key down, character, time), a report that a
+        graphics update was drawn, ("drawn", update id, time), or that the piano
+        can be played, ("ready", 0, time).
+    '''
+    if data[0] == KEY_EVENT:
+        _, key_down, code_point, time_ns = KEY_EVENT_STRUCT.unpack(data)
+        return ("key", key_down, chr(code_point) if code_point else "", time_ns)
+    kind, update_id, time_ns = DRAWN_EVENT_STRUCT.unpack(data)
+    return ("drawn" if kind == DRAWN_EVENT else "ready", update_id, time_ns)
+
+
+def format_latencies(latencies):
+    '''
+    Summarizes a distribution of latencies, e.g., as measured with time.monotonic_ns().
+
+    Parameters
+    ----------
+    latencies : list(int)
+        the latencies in nanoseconds, at least one
+
+    Returns
+    ----------
+    str
+        the p50, p95, p99 and maximum latency in milliseconds, and the number of latencies.
+    '''
+    latencies = sorted(latencies)
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(q / 100 * len(latencies)))] / 1_000_000
+    return (f"p50 {percentile(50):.2f} ms, p95 {percentile(95):.2f} ms, p99 {percentile(99):.2f} ms, "
+            f"max {latencies[-1] / 1_000_000:.2f} ms ({len(latencies)} samples)")
+
+
+def get_refresh_rate():
+    '''
+    Finds the refresh rate of the display.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    ----------
+    int
+        the refresh rate in Hz, or DEFAULT_REFRESH_RATE if it is unknown.
+    '''
+    try:
+        # only available in recent versions of pygame
+        refresh_rates = pygame.display.get_desktop_refresh_rates()
+    except (AttributeError, pygame.error):
+        return DEFAULT_REFRESH_RATE
+    return refresh_rates[0] if refresh_rates and refresh_rates[0] > 0 else DEFAULT_REFRESH_RATE
+
+
+def recv_latest(pout):
+    '''
+    Receives the latest of the messages waiting in a pipe, and drops the older ones.
+        Waits for a message if there is none. Messages are sent with send_bytes().
+
+    Parameters
+    ----------
+    pout : multiprocessing.connection.PipeConnection
+        the pipe to receive from.
+
+    Returns
+    ----------
+    bytes
+        the latest message.
+    int
+        the number of older messages dropped.
+    '''
+    message = pout.recv_bytes()
+    dropped = 0
+    try:
+        while pout.poll():
+            message = pout.recv_bytes()
+            dropped += 1
+    except EOFError:
+        # the pipe was closed after the latest message, the next call raises EOFError
+        pass
+    return message, dropped
+
+
+def gui(user_input_pin, update_graphics_pout):
     '''
     Starts the pygame piano GUI.
 
@@ -59,19 +391,18 @@ def gui(user_input_pin, update_graphics_pout, piano_keys):
         a pipe object for the pygame piano to send key press signals to the LF program.
     update_graphics_pout: multiprocessing.connection.PipeConnection
         a pipe object for the pygame piano to receive acutations from the LF program.
-    piano_keys: dict[str] -> tuple(str, int)
-        a mapping of keyboard characters to piano notes.
 
     Returns
     ----------
     None
     '''
-    gui = PianoGui(user_input_pin, update_graphics_pout, piano_keys)
+    import_pygame()
+    gui = PianoGui(user_input_pin, update_graphics_pout)
     gui.start()
 
 
 class PianoGui:
-    def __init__(self, user_input_pin, update_graphics_pout, piano_keys):
+    def __init__(self, user_input_pin, update_graphics_pout):
         '''
         Initialize the screen of the pygame piano.
 
@@ -81,16 +412,17 @@ class PianoGui:
             a pipe object for the pygame piano to send key press signals to the LF program.
         update_graphics_pout: multiprocessing.connection.PipeConnection
             a pipe object for the pygame piano to receive acutations from the LF program.
-        piano_keys: dict[str] -> tuple(str, int)
-            a mapping of keyboard characters to piano notes.
 
         Returns
         ----------
         None
         '''
         self.user_input_pin = user_input_pin
+        # key presses and drawing reports are sent from different threads
+        self.user_input_lock = Lock()
         self.update_graphics_pout = update_graphics_pout
-        self.note_to_key = {v: k for k, v in piano_keys.items()}
+        # the keyboard characters of the piano keys, received when the piano is started
+        self.note_to_key = {}
 
         pygame.init()
         pygame.font.init()
@@ -109,46 +441,90 @@ class PianoGui:
         self.pressed = pygame.Surface((self.white_key_width, self.height))
         self.pressed.fill((0, 230, 0))
 
+        self.key_rects = self.compute_key_rects()
+
+        # number of graphics updates drawn, and skipped because a newer one was waiting
+        self.updates_drawn = 0
+        self.updates_skipped = 0
+
+
+    def compute_key_rects(self):
+        '''
+        Calculates the area of the screen covered by each key of the pygame piano,
+            from the size of the keyboard image.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        ----------
+        dict[tuple(str, int)] -> pygame.Rect
+            a mapping of notes (Ex. ("D#", 1)) to the area covered by their key.
+        '''
+        scale = self.width / KEYS_PNG_WIDTH
+        vertical_scale = self.height / KEYS_PNG_HEIGHT
+        black_key_size = (BLACK_KEY_SIZE[0] * scale, BLACK_KEY_SIZE[1] * vertical_scale)
+        key_rects = {}
+        for octave in range(OCTAVES):
+            octave_offset = octave * self.width
+            for i, note_name in enumerate(WHITE_KEYS):
+                key_rects[(note_name, octave)] = pygame.Rect(i * self.white_key_width + octave_offset, 0,
+                                                             self.white_key_width, self.height)
+            for offset, note_name in zip(BLACK_KEY_OFFSETS, BLACK_KEYS):
+                key_rects[(note_name, octave)] = pygame.Rect((offset * scale + octave_offset, vertical_scale), black_key_size)
+        return key_rects
+
+
+    def get_key_at(self, position):
+        '''
+        Finds the key of the pygame piano at a position on the screen (Ex. where the mouse was clicked).
+
+        Parameters
+        ----------
+        position: tuple(int, int)
+            the coordinates on the screen.
+
+        Returns
+        ----------
+        tuple(str, int)
+            the note of the key, or None if there is no key at this position.
+        '''
+        # black keys are on top of the white keys
+        for note_name in BLACK_KEYS + WHITE_KEYS:
+            for octave in range(OCTAVES):
+                if self.key_rects[(note_name, octave)].collidepoint(position):
+                    return (note_name, octave)
+        return None
 
-    def get_note_coordinate(self, note_name, octave):
+
+    def send_user_input(self, message):
         '''
-        Calculates the x-coordinate of the note on the screen of the pygame piano
+        Sends a message to the LF program.
 
         Parameters
         ----------
-        note_name: str
-            the name of the note (Ex. "C", "D#", etc...).
-        octave: int
-            the number of octave(s) above the lowest "C" note on the pygame piano.
+        message: bytes
+            either a key event (see pack_key_event) or a report that a graphics update
+            was drawn (see pack_drawn_event). Times are from time.monotonic_ns(), which
+            the LF program can compare to its own.
 
         Returns
         ----------
-        int
-            the x-coordinate of the Note object on the screen.
-        '''
-        octave_offset = octave * self.width
-        if note_name in WHITE_KEYS:
-            coordinate = WHITE_KEYS.index(note_name) * self.white_key_width + octave_offset
-        else:
-            i = BLACK_KEYS.index(note_name)
-            if i == 0:
-                coordinate = 18
-            elif i == 1:
-                coordinate = 58
-            elif i == 2:
-                coordinate = 115
-            elif i == 3:
-                coordinate = 151
-            else:
-                coordinate = 187
-            coordinate += octave_offset
-        return coordinate
+        None
+        '''
+        with self.user_input_lock:
+            self.user_input_pin.send_bytes(message)
 
 
     def listen_for_graphics_update(self):
         '''
         Receives graphics update from the LF program.
-            Redraw the screen upon receiving graphics update.
+            Redraw the keys whose pressed state changed upon receiving graphics update.
+            Each update, (update id, bitmask of the pressed keys) (see pack_graphics_update),
+            holds all the pressed keys, so when several updates are waiting, only the latest
+            one is drawn. The screen is redrawn at most once per refresh of the display.
+            Once an update is on the screen, the LF program is told when it was drawn.
 
         Parameters
         ----------
@@ -158,29 +534,69 @@ class PianoGui:
         ----------
         None
         '''
+        drawn_keys = 0
+        clock = pygame.time.Clock()
+        refresh_rate = get_refresh_rate()
         while 1:
             try:
-                playing_notes = self.update_graphics_pout.recv()
+                message, skipped = recv_latest(self.update_graphics_pout)
             except EOFError:
+                print(f"Piano: drew {self.updates_drawn} graphics updates, skipped {self.updates_skipped} stale ones.")
                 pygame.quit()
                 return
-            self.blit_keyboard()
+            update_id, playing_keys = unpack_graphics_update(message)
+            playing_notes = bits_to_notes(playing_keys)
+            self.updates_skipped += skipped
+
+            # only the keys that were pressed or released need to be redrawn
+            dirty_rects = [self.key_rects[note] for note in bits_to_notes(playing_keys ^ drawn_keys)]
+            for rect in dirty_rects:
+                self.draw_keys(playing_notes, rect)
+            pygame.display.update(dirty_rects)
+            self.send_user_input(pack_drawn_event(update_id, time.monotonic_ns()))
+            drawn_keys = playing_keys
+            self.updates_drawn += 1
+
+            # updates received until the next refresh are merged into one
+            clock.tick(refresh_rate)
+
+
+    def draw_keys(self, playing_notes, area):
+        '''
+        Redraws an area of the keyboard, with the key presses in it.
+
+        Parameters
+        ----------
+        playing_notes: set(tuple(str, int))
+            the notes that are pressed.
+        area: pygame.Rect
+            the area of the screen to redraw.
+
+        Returns
+        ----------
+        None
+        '''
+        # keys overlap, so the pressed keys next to the area are clipped to it
+        self.screen.set_clip(area)
+        self.screen.blit(self.keyboard, area, area)
 
-            # draw the pressed white keys
-            for note_name, octave in playing_notes:
-                if note_name in WHITE_KEYS:
-                    self.screen.blit(self.pressed, (self.get_note_coordinate(note_name, octave), 0), None, pygame.BLEND_SUB)
+        # draw the pressed white keys
+        for note in playing_notes:
+            if note[0] in WHITE_KEYS and self.key_rects[note].colliderect(area):
+                self.screen.blit(self.pressed, self.key_rects[note], None, pygame.BLEND_SUB)
 
-            # draw the pressed black keys
-            for note_name, octave in playing_notes:
-                if note_name in BLACK_KEYS:
-                    self.screen.blit(self.pressed, (self.get_note_coordinate(note_name, octave), 1), (0, 0, 19, 68), pygame.BLEND_ADD)
-            pygame.display.flip()
+        # draw the pressed black keys
+        for note in playing_notes:
+            if note[0] in BLACK_KEYS and self.key_rects[note].colliderect(area):
+                rect = self.key_rects[note]
+                self.screen.blit(self.pressed, rect, ((0, 0), rect.size), pygame.BLEND_ADD)
+        self.screen.set_clip(None)
 
 
-    def blit_keyboard(self):
+    def render_keyboard(self):
         '''
-        Draws the piano keyboard and the key presses for each note.
+        Draws the piano keyboard and the text for each key once, onto the
+        surface the screen is redrawn from.
 
         Parameters
         ----------
@@ -190,27 +606,34 @@ class PianoGui:
         ----------
         None
         '''
+        self.keyboard = pygame.Surface(self.screen.get_size()).convert()
 
         # Displaying the keyboard
         for i in range(OCTAVES):
-            self.screen.blit(self.key_graphic, (i * self.width, 0))
+            self.keyboard.blit(self.key_graphic, (i * self.width, 0))
 
             # Displaying the text for each white key
             for j, white_key in enumerate(WHITE_KEYS):
+                if (white_key, i) not in self.note_to_key:
+                    continue
                 key_surface = self.font.render(self.note_to_key[(white_key, i)], False, (0, 0, 0))
-                self.screen.blit(key_surface,
-                                 (self.get_note_coordinate(white_key, i) + self.white_key_width / 2, self.height * 0.8))
+                self.keyboard.blit(key_surface,
+                                   (self.key_rects[(white_key, i)].x + self.white_key_width / 2, self.height * 0.8))
 
             # Displaying the text for each black key
             for j, black_key in enumerate(BLACK_KEYS):
+                if (black_key, i) not in self.note_to_key:
+                    continue
                 key_surface = self.font.render(self.note_to_key[(black_key, i)], False, (255, 255, 255))
-                self.screen.blit(key_surface,
-                                 (self.get_note_coordinate(black_key, i) + self.white_key_width / 3, self.height * 0.2))
+                self.keyboard.blit(key_surface,
+                                   (self.key_rects[(black_key, i)].x + self.white_key_width / 3, self.height * 0.2))
 
 
     def start(self):
         '''
         starts the pygame piano loop
+            The keyboard is shown as soon as the window is open, and its keys are labelled
+            once their keyboard characters are received from the LF program.
 
         Parameters
         ----------
@@ -220,24 +643,47 @@ class PianoGui:
         ----------
         None
         '''
-        self.blit_keyboard()
+        self.render_keyboard()
+        self.screen.blit(self.keyboard, (0, 0))
+        pygame.display.flip()
+
+        try:
+            piano_keys = receive_piano_keys(self.update_graphics_pout)
+        except EOFError:
+            pygame.quit()
+            return
+        self.note_to_key = {v: k for k, v in piano_keys.items()}
+        self.render_keyboard()
+        self.screen.blit(self.keyboard, (0, 0))
         pygame.display.flip()
+        self.send_user_input(pack_ready_event(time.monotonic_ns()))
 
         listener = Thread(target=self.listen_for_graphics_update)
         listener.daemon = True
         listener.start()
 
+        # the key held down with the mouse, as the character of the keyboard key playing it
+        mouse_key = None
         try:
             while 1:
                 event = pygame.event.wait()
+                # key presses are stamped with the time they were received from pygame
                 if event.type == pygame.QUIT:
                     sys.exit(0)
                 elif event.type == pygame.KEYDOWN:
-                    self.user_input_pin.send((True,           # Key Down == True
-                                              event.unicode))
+                    self.send_user_input(pack_key_event(True,           # Key Down == True
+                                                        event.unicode, time.monotonic_ns()))
                 elif event.type == pygame.KEYUP:
-                    self.user_input_pin.send((False,
-                                              event.unicode))
+                    self.send_user_input(pack_key_event(False,
+                                                        event.unicode, time.monotonic_ns()))
+                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                    # clicking a key plays it as if its keyboard key was pressed
+                    mouse_key = self.note_to_key.get(self.get_key_at(event.pos))
+                    if mouse_key is not None:
+                        self.send_user_input(pack_key_event(True, mouse_key, time.monotonic_ns()))
+                elif event.type == pygame.MOUSEBUTTONUP and event.button == 1 and mouse_key is not None:
+                    self.send_user_input(pack_key_event(False, mouse_key, time.monotonic_ns()))
+                    mouse_key = None
         except KeyboardInterrupt:
             pygame.quit()
             sys.exit(0)
@@ -0,0 +1,142 @@
+'''
+Measures the latency of the piano GUI without a display or a person.
+
+The GUI is run with pygame's dummy video driver, and synthetic key presses and
+releases are injected into its event queue. This script plays the part of the
+LF program: it keeps the bitmask of pressed piano keys, as UpdateGraphics does,
+sends it to the GUI after every key event, and reports the distribution of:
+    - pipe: from the key event in pygame to its reception on the other end,
+    - scheduling: from the reception to the handling of the key event,
+    - render: from sending a graphics update to it being drawn,
+    - total: from the key event to its piano key being drawn (input to photon).
+
+Usage: python3 latency_harness.py [number of key events] [interval between key events in ms]
+'''
+import multiprocessing
+from multiprocessing import connection
+import os
+import queue
+import sys
+import threading
+import time
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+import gui
+import pygame
+
+# a subset of the mapping of TranslateKeyToNote in Piano.lf
+PIANO_KEYS = {
+    "z": ("C", 0),
+    "s": ("C#", 0),
+    "x": ("D", 0),
+    "d": ("D#", 0),
+    "c": ("E", 0),
+    "w": ("C", 1),
+    "3": ("C#", 1),
+    "e": ("D", 1),
+}
+
+
+def run_gui(user_input_pin, update_graphics_pout, num_events, interval):
+    '''
+    Runs the GUI, and a thread that injects key presses and releases into it.
+
+    Parameters
+    ----------
+    user_input_pin : multiprocessing.connection.PipeConnection
+        a Pipe object for the pygame process to send user input to the harness
+    update_graphics_pout : multiprocessing.connection.PipeConnection
+        a Pipe object for the harness to send graphics update to the pygame process
+    num_events : int
+        the number of key events to inject, alternately presses and releases
+    interval : float
+        the time between two key events, in seconds
+
+    Returns
+    ----------
+    None
+    '''
+    gui.import_pygame()
+    g = gui.PianoGui(user_input_pin, update_graphics_pout)
+
+    def press_keys():
+        characters = list(PIANO_KEYS)
+        for i in range(num_events):
+            time.sleep(interval)
+            c = characters[i // 2 % len(characters)]
+            event_type = pygame.KEYDOWN if i % 2 == 0 else pygame.KEYUP
+            pygame.event.post(pygame.event.Event(event_type, unicode=c, key=ord(c), mod=0, scancode=0))
+
+    injector = threading.Thread(target=press_keys)
+    injector.daemon = True
+    injector.start()
+    g.start()
+
+
+def main(num_events=100, interval=0.05):
+    context = multiprocessing.get_context("spawn")
+    user_input_pout, user_input_pin = connection.Pipe(duplex=False)
+    update_graphics_pout, update_graphics_pin = connection.Pipe(duplex=False)
+    p = context.Process(target=run_gui, args=(user_input_pin, update_graphics_pout, num_events, interval))
+    p.start()
+    user_input_pin.close()
+    update_graphics_pout.close()
+    gui.send_piano_keys(update_graphics_pin, PIANO_KEYS)
+
+    # As in the LF program, messages are received by a thread and handed over to another one
+    received = queue.Queue()
+    def listen_for_input():
+        while 1:
+            try:
+                message = gui.unpack_user_input(user_input_pout.recv_bytes())
+            except EOFError:
+                return
+            received.put((message, time.monotonic_ns()))
+    listener = threading.Thread(target=listen_for_input)
+    listener.daemon = True
+    listener.start()
+
+    latencies = {"pipe": [], "scheduling": [], "render": [], "total": []}
+    pressed_keys = 0
+    sent_times = {}
+    pressed_times = {}
+    update_id = 0
+    while len(latencies["total"]) < num_events:
+        try:
+            message, receive_time = received.get(timeout=10)
+        except queue.Empty:
+            print("Error: The GUI stopped responding.")
+            break
+        if message[0] == "ready":
+            continue
+        if message[0] == "key":
+            _, key_down, c, pressed = message
+            latencies["pipe"].append(receive_time - pressed)
+            latencies["scheduling"].append(time.monotonic_ns() - receive_time)
+            if key_down:
+                pressed_keys |= gui.note_to_bit(PIANO_KEYS[c])
+            else:
+                pressed_keys &= ~gui.note_to_bit(PIANO_KEYS[c])
+            update_id += 1
+            sent_times[update_id] = time.monotonic_ns()
+            pressed_times[update_id] = pressed
+            update_graphics_pin.send_bytes(gui.pack_graphics_update(update_id, pressed_keys))
+        else:
+            _, drawn_id, drawn_time = message
+            if drawn_id in sent_times:
+                latencies["render"].append(drawn_time - sent_times[drawn_id])
+            # Updates older than the drawn one were skipped, the drawn one shows their key events too
+            for i in [i for i in sent_times if i <= drawn_id]:
+                del sent_times[i]
+                latencies["total"].append(drawn_time - pressed_times.pop(i))
+
+    p.terminate()
+    p.join()
+    update_graphics_pin.close()
+    for stage, values in latencies.items():
+        if values:
+            print(f"{stage:>10}: {gui.format_latencies(values)}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]), *(int(arg) / 1000 for arg in sys.argv[2:3]))
@@ -1,20 +1,43 @@
+import functools
 import multiprocessing
 from multiprocessing import connection
+import struct
 import threading
+import time
 import sys
 import os
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 
-try:
-    import pygame
-except:
-     print("Import Error: Failed to import 'pygame'. Try 'pip3 install pygame'")
-     sys.exit(1)
+# pygame is only imported by the pygame process, see import_pygame()
+pygame = None
+
+# frames per second at most, when the refresh rate of the display is unknown
+DEFAULT_REFRESH_RATE = 60
+# Number of rendered lines of text, and of laid out messages, kept for the next redraws.
+# The game only shows a handful of distinct lines, besides the response times.
+TEXT_CACHE_SIZE = 64
+LAYOUT_CACHE_SIZE = 16
+
+# Messages from the pygame process to the LF program, in a fixed binary layout:
+# type of the message, key (as a Unicode code point, 0 if none) or update id, time.
+# Times are from time.monotonic_ns().
+KEY_EVENT = 1
+DRAWN_EVENT = 2
+READY_EVENT = 3
+USER_INPUT_STRUCT = struct.Struct("<BIQ")
+
+# Graphics updates from the LF program: update id, background color, text color,
+# followed by the lines of text encoded in UTF-8 and separated by newlines.
+GRAPHICS_UPDATE_STRUCT = struct.Struct("<I3B3B")
 
 
 def start_gui():
     '''
     Spawns a new process that runs the pygame gui.
+    The process imports pygame and opens the window while the LF program starts up,
+    and sends ("ready", 0, time) once the window is shown. It is started with its own
+    multiprocessing context, so this can be called whatever the start method of the
+    program is.
 
     Parameters
     ----------
@@ -29,12 +52,203 @@ def start_gui():
     '''
     user_input_pout, user_input_pin = connection.Pipe(duplex=False)
     update_graphics_pout, update_graphics_pin = connection.Pipe(duplex=False)
-    multiprocessing.set_start_method("spawn")
-    p = multiprocessing.Process(target=gui, args=(user_input_pin, update_graphics_pout))
+    p = multiprocessing.get_context("spawn").Process(target=gui, args=(user_input_pin, update_graphics_pout))
     p.start()
+    # The ends of the pygame process are only kept open by it, so that the LF
+    # program receives EOFError if it stops
+    user_input_pin.close()
+    update_graphics_pout.close()
     return user_input_pout, update_graphics_pin
 
 
+def import_pygame():
+    '''
+    Imports pygame in the pygame process. The LF program only uses this module
+    to start the pygame process and to encode and decode messages, so it does not
+    pay for importing pygame.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    ----------
+    None
+    '''
+    global pygame
+    try:
+        import pygame
+    except:
+        print("Import Error: Failed to import 'pygame'. Try 'pip3 install pygame'")
+        sys.exit(1)
+
+
+def pack_user_input(message):
+    '''
+    Encodes a message for the LF program.
+
+    Parameters
+    ----------
+    message : tuple
+        either a key press, ("key", character, time), a report that a graphics
+        update was drawn, ("drawn", update id, time), or that the window is
+        shown, ("ready", 0, time)
+
+    Returns
+    ----------
+    bytes
+        the encoded message.
+    '''
+    kind, value, time_ns = message
+    if kind == "key":
+        return USER_INPUT_STRUCT.pack(KEY_EVENT, ord(value[0]) if value else 0, time_ns)
+    if kind == "drawn":
+        return USER_INPUT_STRUCT.pack(DRAWN_EVENT, value, time_ns)
+    return USER_INPUT_STRUCT.pack(READY_EVENT, value, time_ns)
+
+
+def unpack_user_input(data):
+    '''
+    Decodes a message from the pygame process, see pack_user_input.
+
+    Parameters
+    ----------
+    data : bytes
+        the encoded message
+
+    Returns
+    ----------
+    tuple
+        the message.
+    '''
+    kind, value, time_ns = USER_INPUT_STRUCT.unpack(data)
+    if kind == KEY_EVENT:
+        return ("key", chr(value) if value else "", time_ns)
+    if kind == DRAWN_EVENT:
+        return ("drawn", value, time_ns)
+    return ("ready", value, time_ns)
+
+
+def pack_graphics_update(update_id, bg_color, text_color, *lines):
+    '''
+    Encodes a graphics update for the pygame process.
+
+    Parameters
+    ----------
+    update_id : int
+        the id of the update
+    bg_color : tuple(int, int, int)
+        the color of the background
+    text_color : tuple(int, int, int)
+        the color of the text
+    lines : str
+        the lines of text to show
+
+    Returns
+    ----------
+    bytes
+        the encoded update.
+    '''
+    return GRAPHICS_UPDATE_STRUCT.pack(update_id, *bg_color, *text_color) + "\n".join(lines).encode("utf-8")
+
+
+def unpack_graphics_update(data):
+    '''
+    Decodes a graphics update from the LF program, see pack_graphics_update.
+
+    Parameters
+    ----------
+    data : bytes
+        the encoded update
+
+    Returns
+    ----------
+    int
+        the id of the update.
+    tuple(int, int, int)
+        the color of the background.
+    tuple(int, int, int)
+        the color of the text.
+    tuple(str)
+        the lines of text.
+    '''
+    update_id, *colors = GRAPHICS_UPDATE_STRUCT.unpack_from(data)
+    text = data[GRAPHICS_UPDATE_STRUCT.size:]
+    lines = tuple(text.decode("utf-8").split("\n")) if text else ()
+    return update_id, tuple(colors[:3]), tuple(colors[3:]), lines
+
+
+def format_latencies(latencies):
+    '''
+    Summarizes a distribution of latencies, e.g., as measured with time.monotonic_ns().
+
+    Parameters
+    ----------
+    latencies : list(int)
+        the latencies in nanoseconds, at least one
+
+    Returns
+    ----------
+    str
+        the p50, p95, p99 and maximum latency in milliseconds, and the number of latencies.
+    '''
+    latencies = sorted(latencies)
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(q / 100 * len(latencies)))] / 1_000_000
+    return (f"p50 {percentile(50):.2f} ms, p95 {percentile(95):.2f} ms, p99 {percentile(99):.2f} ms, "
+            f"max {latencies[-1] / 1_000_000:.2f} ms ({len(latencies)} samples)")
+
+
+def get_refresh_rate():
+    '''
+    Returns the refresh rate of the display in Hz, or DEFAULT_REFRESH_RATE if it is unknown.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    ----------
+    int
+        the refresh rate.
+    '''
+    try:
+        # only available in recent versions of pygame
+        refresh_rates = pygame.display.get_desktop_refresh_rates()
+    except (AttributeError, pygame.error):
+        return DEFAULT_REFRESH_RATE
+    return refresh_rates[0] if refresh_rates and refresh_rates[0] > 0 else DEFAULT_REFRESH_RATE
+
+
+def recv_latest(pout):
+    '''
+    Receives the latest of the messages waiting in a pipe, and drops the older ones.
+        Waits for a message if there is none. Messages are sent with send_bytes().
+
+    Parameters
+    ----------
+    pout : multiprocessing.connection.PipeConnection
+        the pipe to receive from.
+
+    Returns
+    ----------
+    bytes
+        the latest message.
+    int
+        the number of older messages dropped.
+    '''
+    message = pout.recv_bytes()
+    dropped = 0
+    try:
+        while pout.poll():
+            message = pout.recv_bytes()
+            dropped += 1
+    except EOFError:
+        # the pipe was closed after the latest message, the next call raises EOFError
+        pass
+    return message, dropped
+
+
 def gui(user_input_pin, update_graphics_pout):
     '''
     Initializes a Gui class and starts the gui.
@@ -50,6 +264,7 @@ def gui(user_input_pin, update_graphics_pout):
     ----------
     None
     '''
+    import_pygame()
     pygame.init()
     pygame.font.init()
     g = Gui(user_input_pin=user_input_pin, update_graphics_pout=update_graphics_pout)
@@ -73,12 +288,65 @@ class Gui:
         None
         '''
         self.user_input_pin = user_input_pin
+        # Key presses and drawing reports are sent from different threads
+        self.user_input_lock = threading.Lock()
         self.font = pygame.font.SysFont("arial", 18)
         self.size = self.width, self.height = 500, 500
         self.terminate = False
         self.black = 0, 0, 0
         self.screen = pygame.display.set_mode(self.size)
+        # Number of graphics updates drawn, and skipped because a newer one had arrived
+        self.updates_drawn = 0
+        self.updates_skipped = 0
         self.listener = threading.Thread(target=self.listen_for_update_graphic, args=(update_graphics_pout, ))
+        # Rendering text is the slowest part of a redraw, so the lines and their layout
+        # are kept for the next time the same message is shown
+        self.render_text = functools.lru_cache(maxsize=TEXT_CACHE_SIZE)(self.render_text)
+        self.layout = functools.lru_cache(maxsize=LAYOUT_CACHE_SIZE)(self.layout)
+
+    def render_text(self, text, text_color):
+        '''
+        Renders a line of text. The result is cached, see __init__.
+
+        Parameters
+        ----------
+        text : str
+            the line of text
+        text_color : tuple(int, int, int)
+            the color of the text
+
+        Returns
+        ----------
+        pygame.Surface
+            the rendered text.
+        '''
+        return self.font.render(text, False, text_color)
+
+    def layout(self, msg, text_color):
+        '''
+        Renders the lines of a message, centered in the window one below the other.
+        The result is cached, see __init__.
+
+        Parameters
+        ----------
+        msg : tuple(str)
+            the lines of the message
+        text_color : tuple(int, int, int)
+            the color of the text
+
+        Returns
+        ----------
+        list(tuple(pygame.Surface, pygame.Rect))
+            each line and where to draw it, as expected by pygame.Surface.blits.
+        '''
+        lines = []
+        for i, text in enumerate(msg):
+            text_surface = self.render_text(text, text_color)
+            text_height = text_surface.get_height()
+            text_rect = text_surface.get_rect(center=(self.width // 2,
+                                                      self.height // 2 + text_height * (0.5 + i - 0.5 * len(msg))))
+            lines.append((text_surface, text_rect))
+        return lines
 
     def start(self):
         '''
@@ -95,6 +363,7 @@ class Gui:
         '''
         self.screen.fill(self.black)
         pygame.display.flip()
+        self.send_user_input(("ready", 0, time.monotonic_ns()))
         self.listener.daemon = True
         self.listener.start()
         try:
@@ -103,15 +372,39 @@ class Gui:
                 if event.type == pygame.QUIT:
                     sys.exit(0)
                 elif event.type == pygame.KEYDOWN:
-                    self.user_input_pin.send(event.unicode)
+                    # Stamp the key press with the time it was received from pygame
+                    self.send_user_input(("key", event.unicode, time.monotonic_ns()))
         except KeyboardInterrupt:
             pygame.quit()
             sys.exit(0)
 
+    def send_user_input(self, message):
+        '''
+        Sends a message to the LF program, either a key press, ("key", character, time),
+        or a report that a graphics update was drawn, ("drawn", update id, time).
+        Times are from time.monotonic_ns(), which the LF program can compare to its own.
+
+        Parameters
+        ----------
+        message : tuple
+            the message to send
+
+        Returns
+        ----------
+        None
+        '''
+        with self.user_input_lock:
+            self.user_input_pin.send_bytes(pack_user_input(message))
+
     def listen_for_update_graphic(self, update_graphics_pout):
         '''
         Listens for graphics update from the LF program.
         Redraw the pygame window upon receiving graphics update.
+        Each update, (update id, background color, text color, *lines) (see
+        pack_graphics_update), describes the whole window, so if more updates arrived
+        since the last redraw, only the latest one is drawn. The window is redrawn at
+        most once per refresh of the display.
+        Once an update is on the screen, the LF program is told when it was drawn.
 
         Parameters
         ----------
@@ -122,19 +415,23 @@ class Gui:
         ----------
         None
         '''
+        clock = pygame.time.Clock()
+        refresh_rate = get_refresh_rate()
         while 1:
             try:
-                bg_color, text_color, *msg = update_graphics_pout.recv()
+                message, skipped = recv_latest(update_graphics_pout)
             except EOFError:
+                print(f"Drew {self.updates_drawn} graphics updates, skipped {self.updates_skipped} stale ones.")
                 pygame.quit()
                 return
+            self.updates_skipped += skipped
+            update_id, bg_color, text_color, msg = unpack_graphics_update(message)
 
             self.screen.fill(bg_color)
-            for i, text in enumerate(msg):
-                text_surface = self.font.render(text, False, text_color)
-                text_height = text_surface.get_height()
-                text_rect = text_surface.get_rect(center=(self.width // 2,
-                                                          self.height // 2 + text_height * (0.5 + i - 0.5 * len(msg))))
-                self.screen.blit(text_surface, text_rect)
+            self.screen.blits(self.layout(msg, text_color), doreturn=False)
             pygame.display.flip()
+            self.send_user_input(("drawn", update_id, time.monotonic_ns()))
+            self.updates_drawn += 1
 
+            # Updates that arrive before the next refresh are merged into one
+            clock.tick(refresh_rate)
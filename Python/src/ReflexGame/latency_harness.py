@@ -0,0 +1,124 @@
+'''
+Measures the latency of the reflex game GUI without a display or a person.
+
+The GUI is run with pygame's dummy video driver, and synthetic key presses are
+injected into its event queue. This script plays the part of the LF program:
+it answers every key press with a graphics update, as UpdateGraphics does, and
+reports the distribution of:
+    - pipe: from the key press in pygame to its reception on the other end,
+    - scheduling: from the reception to the handling of the key press,
+    - render: from sending a graphics update to it being drawn,
+    - total: from the key press to the answer being drawn (input to photon).
+
+Usage: python3 latency_harness.py [number of key presses] [interval between key presses in ms]
+'''
+import multiprocessing
+from multiprocessing import connection
+import os
+import queue
+import sys
+import threading
+import time
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+import gui
+import pygame
+
+
+def run_gui(user_input_pin, update_graphics_pout, num_presses, interval):
+    '''
+    Runs the GUI, and a thread that injects key presses into it.
+
+    Parameters
+    ----------
+    user_input_pin : multiprocessing.connection.PipeConnection
+        a Pipe object for the pygame process to send user input to the harness
+    update_graphics_pout : multiprocessing.connection.PipeConnection
+        a Pipe object for the harness to send graphics update to the pygame process
+    num_presses : int
+        the number of key presses to inject
+    interval : float
+        the time between two key presses, in seconds
+
+    Returns
+    ----------
+    None
+    '''
+    gui.import_pygame()
+    pygame.init()
+    pygame.font.init()
+    g = gui.Gui(user_input_pin=user_input_pin, update_graphics_pout=update_graphics_pout)
+
+    def press_keys():
+        for _ in range(num_presses):
+            time.sleep(interval)
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, unicode="a", key=pygame.K_a, mod=0, scancode=0))
+
+    injector = threading.Thread(target=press_keys)
+    injector.daemon = True
+    injector.start()
+    g.start()
+
+
+def main(num_presses=100, interval=0.05):
+    context = multiprocessing.get_context("spawn")
+    user_input_pout, user_input_pin = connection.Pipe(duplex=False)
+    update_graphics_pout, update_graphics_pin = connection.Pipe(duplex=False)
+    p = context.Process(target=run_gui, args=(user_input_pin, update_graphics_pout, num_presses, interval))
+    p.start()
+    user_input_pin.close()
+    update_graphics_pout.close()
+
+    # As in the LF program, messages are received by a thread and handed over to another one
+    received = queue.Queue()
+    def listen_for_input():
+        while 1:
+            try:
+                message = gui.unpack_user_input(user_input_pout.recv_bytes())
+            except EOFError:
+                return
+            received.put((message, time.monotonic_ns()))
+    listener = threading.Thread(target=listen_for_input)
+    listener.daemon = True
+    listener.start()
+
+    latencies = {"pipe": [], "scheduling": [], "render": [], "total": []}
+    sent_times = {}
+    pressed_times = {}
+    update_id = 0
+    while len(latencies["total"]) < num_presses:
+        try:
+            message, receive_time = received.get(timeout=10)
+        except queue.Empty:
+            print("Error: The GUI stopped responding.")
+            break
+        if message[0] == "ready":
+            continue
+        if message[0] == "key":
+            _, _, pressed = message
+            latencies["pipe"].append(receive_time - pressed)
+            latencies["scheduling"].append(time.monotonic_ns() - receive_time)
+            update_id += 1
+            sent_times[update_id] = time.monotonic_ns()
+            pressed_times[update_id] = pressed
+            update_graphics_pin.send_bytes(gui.pack_graphics_update(update_id, (205, 92, 92), (0, 0, 0),
+                                                                    f"{update_id}. Key pressed"))
+        else:
+            _, drawn_id, drawn_time = message
+            if drawn_id in sent_times:
+                latencies["render"].append(drawn_time - sent_times[drawn_id])
+            # Updates older than the drawn one were skipped, the drawn one shows their key press too
+            for i in [i for i in sent_times if i <= drawn_id]:
+                del sent_times[i]
+                latencies["total"].append(drawn_time - pressed_times.pop(i))
+
+    p.terminate()
+    p.join()
+    update_graphics_pin.close()
+    for stage, values in latencies.items():
+        if values:
+            print(f"{stage:>10}: {gui.format_latencies(values)}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]), *(int(arg) / 1000 for arg in sys.argv[2:3]))
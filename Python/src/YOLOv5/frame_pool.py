@@ -0,0 +1,145 @@
+import atexit
+import threading
+from collections import deque, namedtuple
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8
+    shared_memory = None
+
+# Identifies a buffer of a shared pool, so that another process
+# can access the frame in it without the frame being copied.
+FrameHandle = namedtuple("FrameHandle", ["name", "index"])
+
+# Pool owning each buffer, by id of the buffer
+_owners = {}
+
+
+class FramePool:
+    """
+    A fixed set of preallocated frame buffers, reused from frame to frame.
+
+    Frames are captured into a buffer obtained with acquire(), and the
+    buffer is given back with release() by the last reactor that uses the
+    frame. If shared is True, the buffers are allocated in shared memory,
+    and another process can read a frame from its handle() with a pool
+    created by attach().
+
+    The shared memory is unmapped by close(), and also removed from the
+    system if this pool created it. A pool that created shared memory is
+    closed when the program exits if it was not closed before.
+
+    Parameters
+    ----------
+    num_buffers : int
+        The number of buffers, i.e., the maximum number of frames in use
+        at the same time.
+    shape : tuple
+        The shape of a frame (height, width, channels).
+    dtype : numpy.dtype
+        The type of the pixels.
+    shared : bool
+        Whether to allocate the buffers in shared memory.
+    name : str
+        The name of the shared memory block, which is chosen by the system
+        by default.
+    """
+    def __init__(self, num_buffers, shape, dtype=np.uint8, shared=False, name=None, _create=True):
+        self.num_buffers = num_buffers
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self._shm = None
+        self._created = _create
+        shape = (num_buffers,) + self.shape
+        if shared:
+            if shared_memory is None:
+                raise RuntimeError("Frame pools in shared memory require Python 3.8 or later")
+            size = int(np.prod(shape)) * self.dtype.itemsize
+            self._shm = shared_memory.SharedMemory(name=name, create=_create, size=size if _create else 0)
+            # Unlike np.ndarray(buffer=...), np.frombuffer() holds on to the
+            # buffer, so that the memory cannot be unmapped under a frame.
+            memory = np.frombuffer(self._shm.buf, dtype=self.dtype, count=int(np.prod(shape))).reshape(shape)
+            if _create:
+                atexit.register(self.close)
+        else:
+            memory = np.empty(shape, dtype=self.dtype)
+        self.buffers = list(memory)
+        self._index = {id(buffer): i for i, buffer in enumerate(self.buffers)}
+        self._free = deque(range(num_buffers) if _create else ())
+        self._lock = threading.Lock()
+        for buffer in self.buffers:
+            _owners[id(buffer)] = self
+
+    @property
+    def name(self):
+        """The name of the shared memory block, or None if the pool is not shared."""
+        return self._shm.name if self._shm is not None else None
+
+    @classmethod
+    def attach(cls, name, num_buffers, shape, dtype=np.uint8):
+        """
+        Access the buffers of a shared pool created by another process.
+        The pool must be closed when its frames are no longer used.
+        """
+        return cls(num_buffers, shape, dtype, shared=True, name=name, _create=False)
+
+    def acquire(self):
+        """
+        Return a free buffer, or None if they are all in use.
+        """
+        with self._lock:
+            return self.buffers[self._free.popleft()] if self._free else None
+
+    def release(self, buffer):
+        """
+        Make a buffer acquired from this pool free again.
+        """
+        index = self._index[id(buffer)]
+        with self._lock:
+            if index not in self._free:
+                self._free.append(index)
+
+    def handle(self, buffer):
+        """
+        Return the handle of a buffer of a shared pool.
+        """
+        return FrameHandle(self.name, self._index[id(buffer)])
+
+    def frame(self, handle):
+        """
+        Return the frame identified by a handle.
+        """
+        return self.buffers[handle.index]
+
+    def close(self):
+        for buffer in self.buffers:
+            _owners.pop(id(buffer), None)
+        # The buffers are views of the shared memory, which cannot be
+        # unmapped while they exist.
+        self.buffers = []
+        self._index = {}
+        self._free.clear()
+        if self._shm is None:
+            return
+        shm, self._shm = self._shm, None
+        try:
+            shm.close()
+        except BufferError:
+            # Frames are still in use, the memory is unmapped when they are gone
+            pass
+        if self._created:
+            atexit.unregister(self.close)
+            shm.unlink()
+
+
+def release(frame):
+    """
+    Give a frame back to the pool it was captured in. Frames that do not
+    come from a pool are ignored.
+    """
+    pool = _owners.get(id(frame))
+    if pool is not None:
+        pool.release(frame)
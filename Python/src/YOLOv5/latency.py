@@ -0,0 +1,114 @@
+import os
+import threading
+
+import numpy as np
+
+# Upper bounds of the histogram buckets in seconds, 10 per decade from 100 us to 10 s
+BUCKETS = np.logspace(-4, 1, 51)
+
+# Latency histogram of each stage, shared by all the reactors of the program
+_histograms = {}
+_lock = threading.Lock()
+
+
+class LatencyHistogram:
+    """
+    A histogram of latencies with fixed buckets, so that recording a
+    latency takes constant time and memory however long the program runs.
+    Percentiles are estimated as the upper bound of the bucket they fall in.
+    """
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        # The last bucket holds the latencies above the last bound
+        self.counts = np.zeros(len(bounds) + 1, dtype=np.int64)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[np.searchsorted(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        if self.count == 0:
+            return None
+        i = np.searchsorted(np.cumsum(self.counts), q / 100 * self.count)
+        return min(float(self.bounds[i]), self.max) if i < len(self.bounds) else self.max
+
+    def summary(self):
+        """
+        Return the count, mean, p50, p95, p99 and max latency, in seconds.
+        """
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max if self.count else None,
+        }
+
+
+def record(stage, nanoseconds):
+    """
+    Record the latency of a stage (e.g., "inference") for one frame.
+    """
+    with _lock:
+        if stage not in _histograms:
+            _histograms[stage] = LatencyHistogram()
+        _histograms[stage].add(float(nanoseconds) / 1_000_000_000)
+
+
+def reset():
+    """
+    Forget the latencies recorded so far, e.g., those of warm-up frames.
+    """
+    with _lock:
+        _histograms.clear()
+
+
+def summaries():
+    """
+    Return the summary of each stage recorded so far.
+    """
+    with _lock:
+        return {stage: histogram.summary() for stage, histogram in _histograms.items()}
+
+
+def write_csv(path, elapsed):
+    """
+    Append the summary of each stage to a CSV file, with the elapsed
+    time of the program in seconds. Latencies are in milliseconds.
+    """
+    new_file = not os.path.exists(path)
+    with open(path, "a") as f:
+        if new_file:
+            f.write("elapsed,stage,count,mean_ms,p50_ms,p95_ms,p99_ms,max_ms\n")
+        for stage, summary in summaries().items():
+            values = [summary[key] for key in ("mean", "p50", "p95", "p99", "max")]
+            f.write(f"{elapsed:.3f},{stage},{summary['count']},"
+                    + ",".join("" if v is None else f"{v * 1000:.3f}" for v in values) + "\n")
+
+
+def write_prometheus(path, name="yolov5_stage_latency_seconds"):
+    """
+    Write the histograms in the Prometheus text format, e.g., for the
+    textfile collector of the node exporter. The file is replaced
+    atomically, so it is never read half written.
+    """
+    lines = [f"# HELP {name} Latency of each stage of the pipeline.", f"# TYPE {name} histogram"]
+    with _lock:
+        for stage, histogram in _histograms.items():
+            cumulative = np.cumsum(histogram.counts)
+            for bound, count in zip(histogram.bounds, cumulative):
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:.6g}"}} {count}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(temporary, path)
+
@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import torch
+
+
+def load_model(weights="yolov5s", repo="ultralytics/yolov5", device=None):
+    """
+    Load a YOLOv5 model through torch.hub.
+
+    Parameters
+    ----------
+    weights : str
+        Either the name of a pretrained model of the repository (e.g.,
+        "yolov5s"), or the path to a model file: PyTorch weights (.pt), or a
+        model exported to TorchScript (.torchscript) or ONNX (.onnx).
+    repo : str
+        Either the GitHub repository of YOLOv5, or the path to a local copy
+        of it (e.g., ~/.cache/torch/hub/ultralytics_yolov5_master after a
+        first run), in which case nothing is downloaded.
+    device : str
+        The device to run the model on. Defaults to "cuda" if CUDA is
+        supported, and "cpu" otherwise.
+
+    Returns
+    -------
+    The model, on the device, and the device.
+    """
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    source = "local" if os.path.isdir(os.path.expanduser(repo)) else "github"
+    repo = os.path.expanduser(repo)
+    if os.path.isfile(os.path.expanduser(weights)):
+        model = torch.hub.load(repo, "custom", path=os.path.expanduser(weights), source=source, device=device)
+    else:
+        model = torch.hub.load(repo, weights, pretrained=True, source=source, device=device)
+    return model.to(device), device
+
+
+def warm_up(model, frame_shape=(480, 640, 3), runs=1):
+    """
+    Run the model on blank frames, so that the first real frame does not
+    pay for the allocations and the compilation done on the first runs.
+    """
+    frame = np.zeros(frame_shape, dtype=np.uint8)
+    for _ in range(runs):
+        model([frame])